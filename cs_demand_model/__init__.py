@@ -3,11 +3,17 @@ from .datacontainer import DemandModellingDataContainer
 from .datastore import fs_datastore
 from .population_stats import PopulationStats
 from .prediction import ModelPredictor
+from .stochastic import StochasticPredictor
+from .transition_matrix import MatrixPredictor, Scenario, ScenarioPredictor
 
 __all__ = [
     "DemandModellingDataContainer",
     "PopulationStats",
     "ModelPredictor",
+    "MatrixPredictor",
+    "ScenarioPredictor",
+    "Scenario",
+    "StochasticPredictor",
     "Config",
     "fs_datastore",
 ]
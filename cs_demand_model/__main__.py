@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
 import click
@@ -7,9 +8,10 @@ from dateutil.relativedelta import relativedelta
 
 from cs_demand_model import (
     DemandModellingDataContainer,
-    ModelPredictor,
+    MatrixPredictor,
     PopulationStats,
 )
+from cs_demand_model._view_cache import CACHE_DIR_ENVVAR
 from cs_demand_model.config import Config
 from cs_demand_model.datastore import fs_datastore
 
@@ -32,12 +34,49 @@ def plot_option(*args, help=None, **kwargs):
     return click.option(*args, help=help, **kwargs)
 
 
+def cache_dir_option(func):
+    return click.option(
+        "--cache-dir",
+        type=click.Path(file_okay=False),
+        envvar=CACHE_DIR_ENVVAR,
+        help="Directory to cache the processed data in between runs",
+    )(func)
+
+
+def workers_option(func):
+    return click.option(
+        "--workers",
+        "-w",
+        type=click.IntRange(min=1),
+        default=1,
+        help="Number of threads to read the source files with",
+    )(func)
+
+
 class CliSetup:
-    def __init__(self, source: str, start: date = None, end: date = None):
+    def __init__(
+        self,
+        source: str,
+        start: date = None,
+        end: date = None,
+        cache_dir: str = None,
+        workers: int = 1,
+    ):
         self.config = Config()
         self.datastore = fs_datastore(source)
-        self.dc = DemandModellingDataContainer(self.datastore, self.config)
-        self.stats = PopulationStats(self.dc.enriched_view, self.config)
+
+        executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            self.dc = DemandModellingDataContainer(
+                self.datastore, self.config, cache_dir=cache_dir, executor=executor
+            )
+            self.stats = PopulationStats(self.dc.enriched_view, self.config)
+        finally:
+            if executor:
+                executor.shutdown()
+
+        # The pool is shut down, so anything the container reads later is read without it
+        self.dc.executor = None
 
         # The default start date in 6m before the end of the dataset
         if start is None:
@@ -80,11 +119,13 @@ def list_files(source: str):
 @click.option("--start", "-s", type=click.DateTime(formats=["%Y-%m-%d"]))
 @click.option("--end", "-e", type=click.DateTime(formats=["%Y-%m-%d"]))
 @click.option("--export", type=click.Path(writable=True))
-def analyse(source: str, start: date, end: date, export):
+@cache_dir_option
+@workers_option
+def analyse(source: str, start: date, end: date, export, cache_dir, workers):
     """
     Opens SOURCE and runs analysis on the data between START and END. SOURCE can be a file or a filesystem URL.
     """
-    setup = CliSetup(source, start, end)
+    setup = CliSetup(source, start, end, cache_dir, workers)
     click.echo(
         f"Running analysis between {style_prop(setup.start)} and {style_prop(setup.end)})"
     )
@@ -103,13 +144,22 @@ def analyse(source: str, start: date, end: date, export):
 @click.option("--prediction_date", "--pd", type=click.DateTime(formats=["%Y-%m-%d"]))
 @plot_option("--plot", "-p", is_flag=True, help="Plot the results")
 @click.option("--export", type=click.Path(writable=True))
+@cache_dir_option
+@workers_option
 def predict(
-    source: str, start: date, end: date, prediction_date: date, plot: bool, export
+    source: str,
+    start: date,
+    end: date,
+    prediction_date: date,
+    plot: bool,
+    export,
+    cache_dir,
+    workers,
 ):
     """
     Analyses SOURCE between start and end, and then predicts the population at prediction_date.
     """
-    setup = CliSetup(source, start, end)
+    setup = CliSetup(source, start, end, cache_dir, workers)
     start, end = setup.start, setup.end
 
     if prediction_date is None:
@@ -120,7 +170,7 @@ def predict(
         f"and predicting to {style_prop(prediction_date)}"
     )
 
-    predictor = ModelPredictor.from_model(setup.stats, start, end)
+    predictor = MatrixPredictor.from_model(setup.stats, start, end)
     prediction_days = (prediction_date - end).days
     predicted_pop = predictor.predict(prediction_days, progress=True)
 
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Hashable, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: Optional[int]
+    currsize: int
+
+
+class BoundedCache:
+    """
+    A small cache owned by a single object, so that cached values are released together with that
+    object rather than being kept alive by a module-level cache such as ``functools.lru_cache``.
+
+    When more than ``maxsize`` values are stored the oldest is evicted, where oldest means least
+    recently used for ``eviction="lru"`` or first stored for ``eviction="fifo"``. A ``maxsize`` of
+    None means unbounded and 0 disables caching.
+    """
+
+    EVICTION_POLICIES = ("lru", "fifo")
+
+    def __init__(self, maxsize: Optional[int] = 5, eviction: str = "lru"):
+        if eviction not in self.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+        self.__maxsize = maxsize
+        self.__eviction = eviction
+        self.__values = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def maxsize(self) -> Optional[int]:
+        return self.__maxsize
+
+    @property
+    def eviction(self) -> str:
+        return self.__eviction
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value for key, calling compute to create it if it is not in the cache.
+        """
+        if key in self.__values:
+            self.__hits += 1
+            if self.__eviction == "lru":
+                self.__values.move_to_end(key)
+            return self.__values[key]
+
+        self.__misses += 1
+        value = compute()
+        if self.__maxsize != 0:
+            self.__values[key] = value
+            if self.__maxsize is not None:
+                while len(self.__values) > self.__maxsize:
+                    self.__values.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.__values.clear()
+        self.__hits = self.__misses = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.__hits, self.__misses, self.__maxsize, len(self.__values))
+
+
+def normalise_key(value: Any) -> Any:
+    """
+    Normalises date-like arguments so that dates, datetimes, numpy datetimes and date strings
+    for the same moment share a cache entry.
+    """
+    if isinstance(value, (date, str, np.datetime64)):
+        try:
+            return pd.Timestamp(value)
+        except ValueError:
+            return value
+    return value
+
+
+class _BoundCachedMethod:
+    def __init__(self, func: Callable, instance: Any, cache: BoundedCache):
+        self.__func = func
+        self.__instance = instance
+        self.__cache = cache
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args):
+        key = tuple(normalise_key(arg) for arg in args)
+        return self.__cache.get(key, lambda: self.__func(self.__instance, *args))
+
+    def cache_info(self) -> CacheInfo:
+        return self.__cache.info()
+
+    def cache_clear(self):
+        self.__cache.clear()
+
+
+class _CachedMethod:
+    def __init__(self, func: Callable, maxsize: Optional[int], eviction: str):
+        self.__func = func
+        self.__maxsize = maxsize
+        self.__eviction = eviction
+        self.__name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.__name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        attribute = f"_cached_method_{self.__name}"
+        cache = instance.__dict__.get(attribute)
+        if cache is None:
+            cache = BoundedCache(
+                maxsize=getattr(instance, "cache_size", self.__maxsize),
+                eviction=getattr(instance, "cache_eviction", self.__eviction),
+            )
+            instance.__dict__[attribute] = cache
+        return _BoundCachedMethod(self.__func, instance, cache)
+
+
+def cached_method(
+    func: Callable = None, *, maxsize: Optional[int] = 5, eviction: str = "lru"
+):
+    """
+    Caches the results of a method in a :class:`BoundedCache` stored on the instance, with date
+    arguments normalised by :func:`normalise_key`. Only positional arguments are supported.
+
+    The cache size and eviction policy are read from the ``cache_size`` and ``cache_eviction``
+    attributes of the instance when it has them, otherwise the defaults given here are used.
+    """
+    if func is None:
+        return lambda f: _CachedMethod(f, maxsize, eviction)
+    return _CachedMethod(func, maxsize, eviction)
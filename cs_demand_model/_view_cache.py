@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import pandas as pd
+
+from cs_demand_model.config import Config
+from cs_demand_model.datastore import DataFile, DataStore
+
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+log = logging.getLogger(__name__)
+
+CACHE_DIR_ENVVAR = "CS_DEMAND_MODEL_CACHE_DIR"
+
+# Bump this when the enriched view changes so that old cache entries are ignored
+CACHE_VERSION = 2
+
+_ENUMS = ("AgeBrackets", "PlacementCategories")
+
+# Feather only stores a default index, so the index is written as a column
+_INDEX = "__index__"
+
+
+def config_fingerprint(config: Config) -> str:
+    source = json.dumps(config.src, sort_keys=True, default=str)
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def file_fingerprint(
+    datastore: DataStore, file: DataFile, chunk_size: int = 1 << 20
+) -> str:
+    """
+    Hashes the content of a file, streaming it in chunks
+    """
+    digest = hashlib.sha256()
+    with datastore.open(file) as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(datastore: DataStore, files: Iterable[DataFile], config: Config) -> str:
+    """
+    Builds a key from the name, size, table type and content of each input file together with the
+    configuration, so that a change to any of them gives a new key.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"v{CACHE_VERSION}|pandas{pd.__version__}".encode())
+    digest.update(config_fingerprint(config).encode())
+    for file in sorted(files, key=lambda f: f.name):
+        metadata = file.metadata
+        table = metadata.table.name if metadata.table else None
+        digest.update(f"|{file.name}|{metadata.size}|{table}|{metadata.year}|".encode())
+        digest.update(file_fingerprint(datastore, file).encode())
+    return digest.hexdigest()
+
+
+class EnrichedViewCache:
+    """
+    A directory of enriched views keyed by :func:`cache_key`. Views are stored as Feather files, which
+    are memory-mapped when read back, if pyarrow is installed and as pickles otherwise.
+
+    Categorical columns of configuration enums are stored by name, and mapped back to the enums of the
+    configuration when loaded.
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        self.__directory = Path(directory)
+        self.__directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def directory(self) -> Path:
+        return self.__directory
+
+    @property
+    def format(self) -> str:
+        return "feather" if feather else "pickle"
+
+    def path(self, key: str) -> Path:
+        return self.__directory / f"enriched-{key}.{self.format}"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.__directory / f"enriched-{key}.json"
+
+    def load(self, key: str, config: Config) -> Optional[pd.DataFrame]:
+        path, meta_path = self.path(key), self._meta_path(key)
+        if not path.exists() or not meta_path.exists():
+            return None
+
+        try:
+            meta = json.loads(meta_path.read_text())
+            enums = meta["enums"]
+            if feather:
+                df = feather.read_table(path, memory_map=True).to_pandas()
+                df = df.set_index(_INDEX).rename_axis(None)
+            else:
+                df = pd.read_pickle(path)
+
+            # String storage isn't preserved by Feather, so is restored from the metadata
+            df = df.astype(meta["strings"])
+            for column, enum_name in enums.items():
+                enum = getattr(config, enum_name)
+                df[column] = df[column].cat.rename_categories(
+                    [enum[name] for name in df[column].cat.categories]
+                )
+        except Exception as ex:
+            log.warning("Failed to read cached view %s: %s", path, ex)
+            return None
+
+        log.debug("Loaded enriched view from %s", path)
+        return df
+
+    def save(self, key: str, df: pd.DataFrame, config: Config):
+        enums = {}
+        strings = {
+            column: f"string[{dtype.storage}]"
+            for column, dtype in df.dtypes.items()
+            if isinstance(dtype, pd.StringDtype)
+        }
+        df = df.copy()
+        for column in df.columns:
+            if not isinstance(df[column].dtype, pd.CategoricalDtype):
+                continue
+            categories = df[column].cat.categories
+            for enum_name in _ENUMS:
+                enum = getattr(config, enum_name)
+                if len(categories) and all(isinstance(c, enum) for c in categories):
+                    df[column] = df[column].cat.rename_categories(
+                        [c.name for c in categories]
+                    )
+                    enums[column] = enum_name
+                    break
+
+        path, meta_path = self.path(key), self._meta_path(key)
+        try:
+            # Write to temporary files and rename so a partial write is never read
+            tmp_path = path.with_suffix(path.suffix + ".tmp")
+            if feather:
+                feather.write_feather(df.rename_axis(_INDEX).reset_index(), tmp_path)
+            else:
+                df.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+
+            tmp_meta = meta_path.with_suffix(".json.tmp")
+            tmp_meta.write_text(json.dumps({"enums": enums, "strings": strings}))
+            os.replace(tmp_meta, meta_path)
+        except Exception as ex:
+            log.warning("Failed to write cached view %s: %s", path, ex)
@@ -2,6 +2,8 @@ import logging
 from enum import Enum
 from typing import Any, Dict, Optional, Tuple
 
+import numpy as np
+
 from ._placement_categories import PlacementCategories
 
 logger = logging.getLogger(__name__)
@@ -69,6 +71,18 @@ class AgeBrackets(Enum):
                 return bracket
         return None
 
+    @classmethod
+    def bin_edges(cls) -> Tuple[np.ndarray, Tuple[Optional["AgeBrackets"], ...]]:
+        """
+        Returns the sorted boundaries of all the brackets, together with the bracket that covers each
+        interval between consecutive boundaries (or None for gaps). An age falls into interval ``i`` if
+        ``edges[i] <= age < edges[i + 1]``, which gives the same result as :meth:`bracket_for_age`
+        even if the brackets overlap or leave gaps.
+        """
+        edges = np.unique([b.start for b in cls] + [b.end for b in cls]).astype(float)
+        brackets = tuple(cls.bracket_for_age(edge) for edge in edges[:-1])
+        return edges, brackets
+
     @classmethod
     def for_index(cls, index: int) -> Optional["AgeBrackets"]:
         for bracket in cls:
@@ -1,8 +1,60 @@
-from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Mapping, Sequence
 
 import pandas as pd
 
-from cs_demand_model.datastore import TableType
+from cs_demand_model.datastore import FileFormat, TableType
+
+try:
+    import pyarrow  # noqa: F401
+
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = "string"
+
+DATE_FORMAT = "%d/%m/%Y"
+
+
+@dataclass(frozen=True)
+class ReadSchema:
+    """
+    The columns of a table that the model uses, with the dtypes to read them as and the date
+    columns to parse
+    """
+
+    columns: Sequence[str]
+    dtypes: Mapping[str, str] = field(default_factory=dict)
+    dates: Sequence[str] = ()
+    date_format: str = DATE_FORMAT
+
+    def read_kwargs(self, file_format: FileFormat = None) -> dict:
+        """
+        Returns the keyword arguments to read only these columns with the pandas reader for the
+        format. JSON can't select columns while reading, so is handled by :meth:`apply`.
+        """
+        if file_format == FileFormat.JSON:
+            return {}
+        dtypes = dict(self.dtypes)
+        # Dates are read as text and parsed with the explicit format in apply
+        dtypes.update({column: "object" for column in self.dates})
+        return dict(usecols=list(self.columns), dtype=dtypes)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Selects the columns of the schema, converts them to the schema dtypes and parses the dates
+        """
+        df = df.loc[:, list(self.columns)].astype(dict(self.dtypes))
+        for column in df.columns:
+            # Typed sources such as Excel or Parquet give numeric codes, whereas CSV gives text
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                categories = df[column].cat.categories
+                if categories.dtype != object:
+                    df[column] = df[column].cat.rename_categories(
+                        categories.astype(str)
+                    )
+        for column in self.dates:
+            df[column] = pd.to_datetime(df[column], format=self.date_format)
+        return df
 
 
 class Episodes:
@@ -20,10 +72,26 @@ class Episodes:
         "HOME_POST",
         "PL_POST",
     ]
+    schema = ReadSchema(
+        columns=["CHILD", "DECOM", "RNE", "LS", "PLACE", "DEC", "REC"],
+        dtypes={
+            "CHILD": STRING_DTYPE,
+            "RNE": "category",
+            "LS": "category",
+            "PLACE": "category",
+            "REC": "category",
+        },
+        dates=["DECOM", "DEC"],
+    )
 
 
 class Header:
     fields = ["CHILD", "SEX", "DOB", "ETHNIC", "UPN", "MOTHER", "MC_DOB"]
+    schema = ReadSchema(
+        columns=["CHILD", "SEX", "DOB", "ETHNIC"],
+        dtypes={"CHILD": STRING_DTYPE, "SEX": "category", "ETHNIC": "category"},
+        dates=["DOB"],
+    )
 
 
 class Reviews:
@@ -1,86 +1,260 @@
 import dataclasses
 import logging
+from concurrent.futures import Executor
 from datetime import date
-from functools import cached_property
-from typing import Any, Generator, List, Optional, Tuple
+from functools import cached_property, partial
+from pathlib import Path
+from typing import Callable, Generator, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
+from cs_demand_model._view_cache import EnrichedViewCache, cache_key
 from cs_demand_model.config import Config
 from cs_demand_model.data.ssda903 import SSDA903TableType
-from cs_demand_model.datastore import DataFile, DataStore, TableType
+from cs_demand_model.datastore import DataFile, DataStore, FileFormat, TableType
 
 log = logging.getLogger(__name__)
 
 
+def _concat(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenates frames, first extending categorical columns to the union of their categories so that
+    they stay categorical rather than falling back to object.
+    """
+    for column in frames[0].columns:
+        if not all(isinstance(df[column].dtype, pd.CategoricalDtype) for df in frames):
+            continue
+        categories = frames[0][column].cat.categories
+        for df in frames[1:]:
+            categories = categories.union(df[column].cat.categories)
+        frames = [
+            df.assign(**{column: df[column].cat.set_categories(categories)})
+            for df in frames
+        ]
+    return pd.concat(frames)
+
+
+def clean_episodes(
+    child: np.ndarray, decom: np.ndarray, dec: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Works out how to clean up the episodes of each child, given the child as integer codes in sort
+    order and the start and end dates of the episodes as datetime64 arrays with no missing starts.
+
+    The episodes are sorted by child, start and end, with missing end dates first, and then:
+
+    * If a child has two episodes starting on the same day (usually if NA in one year and then done
+      in the next) the one with the latest finish date is kept.
+    * If a child has two episodes with the same end date, the longer one is kept. This also works
+      for open episodes - if there are two open, the longer one is kept.
+    * If a child has overlapping episodes, the earlier one is shortened to end when the next starts,
+      as are open episodes that are followed by another.
+
+    :return: The order that sorts the episodes, a mask of the sorted episodes to keep, and the
+             corrected end dates of the sorted episodes
+    """
+    # Missing dates are the smallest integer, so sort first
+    decom = decom.view("i8")
+    dec = dec.view("i8")
+    missing = np.iinfo(np.int64).min
+
+    order = np.lexsort((dec, decom, child))
+    child, decom, dec = child[order], decom[order], dec[order]
+    same_child = child[1:] == child[:-1]
+
+    # Keep the last of the episodes with the same start
+    keep = np.ones(len(order), dtype=bool)
+    keep[:-1] = ~(same_child & (decom[1:] == decom[:-1]))
+
+    # Of those, keep the first of the episodes with the same end. These needn't be next to each
+    # other, so the remaining episodes are grouped by end date with a stable sort.
+    remaining = np.flatnonzero(keep)
+    by_end = remaining[np.lexsort((dec[remaining], child[remaining]))]
+    duplicate = (child[by_end][1:] == child[by_end][:-1]) & (
+        dec[by_end][1:] == dec[by_end][:-1]
+    )
+    keep[by_end[1:][duplicate]] = False
+
+    # Shorten open and overlapping episodes to end when the next one starts
+    remaining = np.flatnonzero(keep)
+    decom_next = np.full(len(remaining), missing)
+    has_next = child[remaining][1:] == child[remaining][:-1]
+    decom_next[:-1][has_next] = decom[remaining][1:][has_next]
+    dec_remaining = dec[remaining]
+    change = (dec_remaining == missing) | (
+        (decom_next != missing) & (dec_remaining > decom_next)
+    )
+    dec[remaining[change]] = decom_next[change]
+
+    return order, keep, dec.view("datetime64[ns]")
+
+
+def _detect_file(
+    datastore: DataStore, file_info: DataFile
+) -> Tuple[Optional[DataFile], Optional[pd.DataFrame]]:
+    """
+    Detects the format and table type of a file where they aren't already known.
+
+    :return: The file with its metadata filled in, or None if it can't be read, together with the
+             frame if the file had to be read in full
+    """
+    if not file_info.metadata.format:
+        try:
+            file_format = datastore.detect_format(file_info)
+        except Exception as ex:
+            log.warning("Failed to read file %s: %s", file_info, ex)
+            return None, None
+        metadata = dataclasses.replace(file_info.metadata, format=file_format)
+        file_info = dataclasses.replace(file_info, metadata=metadata)
+
+    frame = None
+    if not file_info.metadata.table:
+        table_type, year, frame = _detect_table_type(datastore, file_info)
+        metadata = dataclasses.replace(file_info.metadata, table=table_type, year=year)
+        file_info = dataclasses.replace(file_info, metadata=metadata)
+
+    return file_info, frame
+
+
+def _detect_table_type(
+    datastore: DataStore, file_info: DataFile
+) -> Tuple[Optional[TableType], Optional[int], Optional[pd.DataFrame]]:
+    """
+    Detect the table type of a file by reading the header row and looking for a
+    known table type. For episodes the year is found from the DECOM column alone.
+
+    JSON can't be read a row at a time, so those files are read in full and the frame is returned
+    to be used the first time the table is requested.
+
+    :param datastore: The datastore to read the file from
+    :param file_info: The file to detect the table type for
+    :return: The table type or None if not found, the year, and the frame if read in full
+    """
+    full_read = file_info.metadata.format == FileFormat.JSON
+    try:
+        if full_read:
+            df = datastore.to_dataframe(file_info)
+        else:
+            df = datastore.to_dataframe(file_info, nrows=0)
+    except Exception as ex:
+        log.warning("Failed to read file %s: %s", file_info, ex)
+        return None, None, None
+
+    for table_type in SSDA903TableType:
+        table_class = table_type.value
+        fields = table_class.fields
+        if len(set(fields) - set(df.columns)) == 0:
+            break
+    else:
+        table_type = None
+
+    year = None
+    if table_type == SSDA903TableType.EPISODES:
+        if not full_read:
+            df = datastore.to_dataframe(file_info, usecols=["DECOM"])
+        year = max(pd.to_datetime(df["DECOM"], dayfirst=True).dt.year)
+
+    return table_type, year, df if full_read else None
+
+
+def _read_file(
+    datastore: DataStore, file_info: DataFile, df: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    Reads a table, using the frame parsed during detection if given. Tables with a read schema only
+    load the columns the model uses, with their dtypes and dates parsed.
+    """
+    metadata = file_info.metadata
+    schema = getattr(metadata.table.value, "schema", None) if metadata.table else None
+
+    if df is None:
+        kwargs = schema.read_kwargs(metadata.format) if schema else {}
+        df = datastore.to_dataframe(file_info, **kwargs)
+    return schema.apply(df) if schema else df
+
+
 class DemandModellingDataContainer:
     """
     A container for demand modelling data. Indexes data by year and table type. Provides methods for
     merging data to create a single, consistent dataset.
     """
 
-    def __init__(self, datastore: DataStore, config: Config):
+    def __init__(
+        self,
+        datastore: DataStore,
+        config: Config,
+        cache_dir: Optional[Union[str, Path]] = None,
+        executor: Optional[Executor] = None,
+    ):
+        """
+        :param datastore: The datastore to read the files from
+        :param config: The model configuration
+        :param cache_dir: A directory to cache the enriched view in
+        :param executor: An executor to detect and read the files with, e.g. a thread pool for
+                         CSV files or a process pool for Excel files, which are slow to parse.
+                         Files are read one after another if not given. A process pool needs a
+                         datastore that can be pickled.
+        """
         self.__datastore = datastore
         self.__config = config
+        self.__cache = EnrichedViewCache(cache_dir) if cache_dir else None
+        self.__executor = executor
+
+        # Frames that had to be read in full during detection, kept for the first read of the table
+        self.__frames = {}
 
         self.__file_info = []
-        for file_info in datastore.files:
-            if not file_info.metadata.table:
-                table_type, year = self._detect_table_type(file_info)
-                metadata = dataclasses.replace(
-                    file_info.metadata, table=table_type, year=year
-                )
-                file_info = dataclasses.replace(file_info, metadata=metadata)
+        manifest = getattr(datastore, "manifest", None)
+        detected = self._map(partial(_detect_file, datastore), list(datastore.files))
+        for file_info, frame in detected:
+            # Keep what was detected so that it isn't detected again while the file is unchanged
+            if manifest is not None and file_info is not None:
+                manifest.record(file_info)
 
             # We only care about Header and Episodes
-            if file_info.metadata.table in [
+            if file_info and file_info.metadata.table in [
                 SSDA903TableType.HEADER,
                 SSDA903TableType.EPISODES,
             ]:
                 self.__file_info.append(file_info)
+                if frame is not None:
+                    self.__frames[file_info.name] = frame
 
     @property
     def file_info(self):
         return self.__file_info
 
-    def __read_first_line(self, file_info: DataFile) -> List[Any]:
+    @property
+    def executor(self) -> Optional[Executor]:
         """
-        Reads the first line of a file and returns the values as a list.
-        This only currently works for CSV files.
+        The executor files are read with, or None to read them one after another. Clear this before
+        shutting the executor down if the container is still to be used.
         """
-        with self.__datastore.open(file_info) as f:
-            reader = self.__datastore.to_dataframe(file_info)
-            return next(reader)
+        return self.__executor
 
-    def _detect_table_type(
-        self, file_info: DataFile
-    ) -> Tuple[Optional[TableType], Optional[int]]:
-        """
-        Detect the table type of a file by reading the first line of the file and looking for a
-        known table type.
+    @executor.setter
+    def executor(self, executor: Optional[Executor]):
+        self.__executor = executor
 
-        :param file_info: The file to detect the table type for
-        :return: The table type or None if not found.
+    def _map(self, fn: Callable, *iterables) -> list:
         """
-        try:
-            df = self.__datastore.to_dataframe(file_info)
-        except Exception as ex:
-            log.warning("Failed to read file %s: %s", file_info, ex)
-            return None, None
-
-        table_type = None
-        for table_type in SSDA903TableType:
-            table_class = table_type.value
-            fields = table_class.fields
-            if len(set(fields) - set(df.columns)) == 0:
-                break
+        Applies the function using the executor if there is one. The results are always in the order
+        of the arguments, however the work is scheduled.
+        """
+        if self.__executor is None:
+            return list(map(fn, *iterables))
+        return list(self.__executor.map(fn, *iterables))
 
-        year = None
-        if table_type == SSDA903TableType.EPISODES:
-            df["DECOM"] = pd.to_datetime(df["DECOM"], dayfirst=True)
-            year = max(df["DECOM"].dt.year)
+    def _read(self, file_info: DataFile) -> pd.DataFrame:
+        return self._read_many([file_info])[0]
 
-        return table_type, year
+    def _read_many(self, file_info: List[DataFile]) -> List[pd.DataFrame]:
+        """
+        Reads several tables at once, using the frames parsed during detection where there are any
+        """
+        frames = [self.__frames.pop(info.name, None) for info in file_info]
+        return self._map(partial(_read_file, self.__datastore), file_info, frames)
 
     @property
     def first_year(self):
@@ -94,6 +268,16 @@ class DemandModellingDataContainer:
             [info.metadata.year for info in self.__file_info if info.metadata.year]
         )
 
+    def _find_table(self, year: int, table_type: TableType) -> DataFile:
+        for info in self.__file_info:
+            metadata = info.metadata
+            if metadata.year == year and metadata.table == table_type:
+                return info
+
+        raise ValueError(
+            f"Could not find table for year {year} and table type {table_type}"
+        )
+
     def get_table(self, year: int, table_type: TableType) -> pd.DataFrame:
         """
         Gets a table for a given year and table type.
@@ -102,47 +286,69 @@ class DemandModellingDataContainer:
         :param table_type: The table type to get
         :return: A pandas DataFrame containing the table data
         """
-        for info in self.__file_info:
-            metadata = info.metadata
-            if metadata.year == year and metadata.table == table_type:
-                return self.__datastore.to_dataframe(info)
-
-        raise ValueError(
-            f"Could not find table for year {year} and table type {table_type}"
-        )
+        return self._read(self._find_table(year, table_type))
 
     def get_tables_by_type(
         self, table_type: TableType
     ) -> Generator[pd.DataFrame, None, None]:
-        for info in self.__file_info:
-            if info.metadata.table == table_type:
-                yield self.__datastore.to_dataframe(info)
+        file_info = [
+            info for info in self.__file_info if info.metadata.table == table_type
+        ]
+        yield from self._read_many(file_info)
 
-    def combined_year(self, year: int) -> pd.DataFrame:
+    @cached_property
+    def _header(self) -> Tuple[pd.DataFrame, pd.Index]:
+        return self._build_header(
+            list(self.get_tables_by_type(SSDA903TableType.HEADER))
+        )
+
+    @property
+    def header(self) -> pd.DataFrame:
         """
-        Returns the combined view for the year consisting of Episodes and Headers
+        Returns the union of all the header tables, with one row per child. This is read once and
+        shared by every year. Children are identified by integer codes, see :attr:`child_ids`.
+        """
+        return self._header[0]
 
-        :param year: The year to get the combined view for
-        :return: A pandas DataFrame containing the combined view
+    @property
+    def child_ids(self) -> pd.Index:
         """
-        header = list(self.get_tables_by_type(SSDA903TableType.HEADER))
-        if len(list(header)) == 0:
-            raise ValueError("No headers found")
-        header = pd.concat(header)
-        header = header.drop_duplicates(subset=["CHILD"])
+        The IDs of the children in sorted order. The CHILD columns of the header and the combined
+        views hold positions in this index, so ``child_ids[combined["CHILD"]]`` gives the IDs back
+        for reporting.
+        """
+        return self._header[1]
 
-        episodes = self.get_table(year, SSDA903TableType.EPISODES)
+    @staticmethod
+    def _build_header(header: List[pd.DataFrame]) -> Tuple[pd.DataFrame, pd.Index]:
+        if len(header) == 0:
+            raise ValueError("No headers found")
+        header = _concat(header)
 
-        # TODO: This should be done when the table is first read
-        header["DOB"] = pd.to_datetime(header["DOB"], format="%d/%m/%Y")
-        episodes["DECOM"] = pd.to_datetime(episodes["DECOM"], format="%d/%m/%Y")
-        episodes["DEC"] = pd.to_datetime(episodes["DEC"], format="%d/%m/%Y")
+        # The codes follow the order of the IDs, so sorting by code sorts by ID
+        codes, child_ids = pd.factorize(header["CHILD"], sort=True)
+        header["CHILD"] = codes.astype(np.int32)
+        header = header.drop_duplicates(subset=["CHILD"])
+        return header, pd.Index(child_ids, name="CHILD")
 
-        merged = header.merge(
+    def _merge_header(self, episodes: pd.DataFrame) -> pd.DataFrame:
+        # Children without a header have no code and are dropped by the merge
+        episodes = episodes.assign(
+            CHILD=self.child_ids.get_indexer(episodes["CHILD"]).astype(np.int32)
+        )
+        return self.header.merge(
             episodes, how="inner", on="CHILD", suffixes=("_header", "_episodes")
         )
 
-        return merged
+    def combined_year(self, year: int) -> pd.DataFrame:
+        """
+        Returns the combined view for the year consisting of Episodes and Headers
+
+        :param year: The year to get the combined view for
+        :return: A pandas DataFrame containing the combined view
+        """
+        episodes = self.get_table(year, SSDA903TableType.EPISODES)
+        return self._merge_header(episodes)
 
     @cached_property
     def combined_data(self) -> pd.DataFrame:
@@ -154,46 +360,49 @@ class DemandModellingDataContainer:
                          the values for all years in this container
         :return: A pandas DataFrame containing the combined view
         """
-        combined = pd.concat(
-            [
-                self.combined_year(year)
-                for year in range(self.first_year, self.last_year + 1)
+        # The episodes for all years are merged against the header in one go. The merge keeps
+        # the order of each child's episodes, so the result matches merging year by year.
+        episodes = [
+            self._find_table(year, SSDA903TableType.EPISODES)
+            for year in range(self.first_year, self.last_year + 1)
+        ]
+        if "_header" in self.__dict__:
+            episodes = self._read_many(episodes)
+        else:
+            # Read the headers together with the episodes so they are all parsed at once
+            headers = [
+                info
+                for info in self.__file_info
+                if info.metadata.table == SSDA903TableType.HEADER
             ]
-        )
+            frames = self._read_many(headers + episodes)
+            self._header = self._build_header(frames[: len(headers)])
+            episodes = frames[len(headers) :]
+
+        combined = self._merge_header(_concat(episodes))
 
         # Just do some basic data validation checks
-        assert not combined["CHILD"].isna().any()
+        assert (combined["CHILD"] >= 0).all()
         assert not combined["DECOM"].isna().any()
 
-        # Then clean up the episodes
-        # We first sort by child, decom and dec, and make sure NAs are first (for dropping duplicates)
-        combined.sort_values(
-            ["CHILD", "DECOM", "DEC"], inplace=True, na_position="first"
-        )
-
-        # If a child has two episodes starting on the same day (usually if NA in one year and then done in next)
-        # keep the latest non-NA finish date
-        combined.drop_duplicates(["CHILD", "DECOM"], keep="last", inplace=True)
-        log.debug(
-            "%s records remaining after removing episodes that start on the same date.",
-            combined.shape,
-        )
-
-        # If a child has two episodes with the same end date, keep the longer one.
-        # This also works for open episodes - if there are two open, keep the larger one.
-        combined.drop_duplicates(["CHILD", "DEC"], keep="first", inplace=True)
-        log.debug(
-            "%s records remaining after removing episodes that end on the same date.",
-            combined.shape,
+        # Then clean up the episodes in one pass over the key columns, and only then copy the rows
+        order, keep, dec = clean_episodes(
+            combined["CHILD"].values, combined["DECOM"].values, combined["DEC"].values
         )
+        log.debug("%s records remaining after cleaning episodes.", keep.sum())
 
-        # If a child has overlapping episodes, shorten the earlier one
-        decom_next = combined.groupby("CHILD")["DECOM"].shift(-1)
-        change_ix = combined["DEC"].isna() | combined["DEC"].gt(decom_next)
-        combined.loc[change_ix, "DEC"] = decom_next[change_ix]
+        combined = combined.take(order[keep])
+        combined["DEC"] = dec[keep]
 
         return combined
 
+    @cached_property
+    def cache_key(self) -> str:
+        """
+        A fingerprint of the input files and configuration, used to key the enriched view cache
+        """
+        return cache_key(self.__datastore, self.__file_info, self.__config)
+
     @cached_property
     def enriched_view(self) -> pd.DataFrame:
         """
@@ -202,26 +411,33 @@ class DemandModellingDataContainer:
         * age - the age of the child at the start of the episode
         * age_end - the age of the child at the end of the episode
 
+        If the container was given a cache directory the view is read from there when the input files
+        and configuration are unchanged, and written there otherwise.
         """
+        if self.__cache is None:
+            return self._enrich()
+
+        enriched = self.__cache.load(self.cache_key, self.__config)
+        if enriched is None:
+            enriched = self._enrich()
+            self.__cache.save(self.cache_key, enriched, self.__config)
+        return enriched
+
+    def _enrich(self) -> pd.DataFrame:
         combined = self.combined_data
         combined = self._add_ages(combined)
         combined = self._add_age_bins(combined)
         combined = self._add_placement_category(combined)
-        combined = self._add_related_placement_type(
-            combined, 1, "placement_type_before"
-        )
-        combined = self._add_related_placement_type(
-            combined, -1, "placement_type_after"
-        )
+        combined = self._add_related_placement_types(combined)
         return combined
 
     @cached_property
     def start_date(self) -> date:
-        return self.combined_data[["DECOM", "DEC"]].min().min()
+        return self.enriched_view[["DECOM", "DEC"]].min().min()
 
     @cached_property
     def end_date(self) -> date:
-        return self.combined_data[["DECOM", "DEC"]].max().max()
+        return self.enriched_view[["DECOM", "DEC"]].max().max()
 
     def _add_ages(self, combined: pd.DataFrame) -> pd.DataFrame:
         """
@@ -243,47 +459,89 @@ class DemandModellingDataContainer:
 
         WARNING: This method modifies the dataframe in place.
         """
-        AgeBracket = self.__config.AgeBrackets
-        combined["age_bin"] = combined["age"].apply(AgeBracket.bracket_for_age)
-        combined["end_age_bin"] = combined["end_age"].apply(AgeBracket.bracket_for_age)
+        combined["age_bin"] = self._age_bins(combined["age"])
+        combined["end_age_bin"] = self._age_bins(combined["end_age"])
         return combined
 
-    def _add_related_placement_type(
-        self, combined: pd.DataFrame, offset: int, new_column_name: str
-    ) -> pd.DataFrame:
+    def _age_bins(self, ages: pd.Series) -> pd.Categorical:
+        """
+        Bins the ages into a categorical of AgeBrackets. Ages that do not fall into a bracket (including
+        missing ages) are left as NaN.
+        """
+        AgeBracket = self.__config.AgeBrackets
+        categories = list(AgeBracket)
+        edges, brackets = AgeBracket.bin_edges()
+
+        # Position 0 is below the first edge and the last position is at or above the final edge
+        lookup = np.array(
+            [-1]
+            + [categories.index(b) if b is not None else -1 for b in brackets]
+            + [-1]
+        )
+        codes = lookup[np.searchsorted(edges, ages.values, side="right")]
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    def _add_related_placement_types(self, combined: pd.DataFrame) -> pd.DataFrame:
         """
-        Adds the related placement type, -1 for following, or 1 for preceeding.
+        Adds the placement type of the preceding and following episodes as placement_type_before and
+        placement_type_after. These are NOT_IN_CARE if there is no such episode for the child, or if
+        there is a gap between the episodes.
+
+        The episodes must be sorted by child and start date, as they are by :attr:`combined_data`,
+        and both columns are found from the neighbouring rows in one pass.
 
         WARNING: This method modifies the dataframe in place.
         """
         PlacementCategories = self.__config.PlacementCategories
+        categories = list(PlacementCategories)
+        not_in_care = categories.index(PlacementCategories.NOT_IN_CARE)
 
-        combined = combined.sort_values(["CHILD", "DECOM", "DEC"], na_position="first")
+        child = combined["CHILD"].values
+        decom = combined["DECOM"].values
+        dec = combined["DEC"].values
+        codes = pd.Categorical(combined["placement_type"], categories=categories).codes
 
-        combined[new_column_name] = (
-            combined.groupby("CHILD")["placement_type"]
-            .shift(offset)
-            .fillna(PlacementCategories.NOT_IN_CARE)
-        )
+        # Whether each episode follows straight on from the one before it
+        continues = (child[1:] == child[:-1]) & (decom[1:] == dec[:-1])
 
-        offset_mask = combined["CHILD"] == combined["CHILD"].shift(offset)
-        if offset > 0:
-            offset_mask &= combined["DECOM"] != combined["DEC"].shift(offset)
-        else:
-            offset_mask &= combined["DEC"] != combined["DECOM"].shift(offset)
-        combined.loc[offset_mask, new_column_name] = PlacementCategories.NOT_IN_CARE
+        before = np.full(len(codes), not_in_care, dtype=codes.dtype)
+        before[1:][continues] = codes[:-1][continues]
+        after = np.full(len(codes), not_in_care, dtype=codes.dtype)
+        after[:-1][continues] = codes[1:][continues]
+
+        combined["placement_type_before"] = pd.Categorical.from_codes(
+            before, categories=categories
+        )
+        combined["placement_type_after"] = pd.Categorical.from_codes(
+            after, categories=categories
+        )
         return combined
 
     def _add_placement_category(self, combined: pd.DataFrame) -> pd.DataFrame:
         """
-        Adds placement category for
+        Adds placement category for the PLACE code of the episode. The result is a categorical of
+        PlacementCategories, which is shared with the related placement type columns.
 
         WARNING: This method modifies the dataframe in place.
         """
         PlacementCategories = self.__config.PlacementCategories
-        combined["placement_type"] = combined["PLACE"].apply(
-            lambda x: PlacementCategories.placement_type_map.get(
-                x, PlacementCategories.OTHER
-            )
+        categories = list(PlacementCategories)
+        place = pd.Categorical(combined["PLACE"])
+
+        # Map each distinct placement code once, with unknown or missing codes mapped to OTHER
+        other = categories.index(PlacementCategories.OTHER)
+        lookup = np.array(
+            [
+                categories.index(
+                    PlacementCategories.placement_type_map.get(
+                        code, PlacementCategories.OTHER
+                    )
+                )
+                for code in place.categories
+            ]
+            + [other]
+        )
+        combined["placement_type"] = pd.Categorical.from_codes(
+            lookup[place.codes], categories=categories
         )
         return combined
@@ -1,10 +1,22 @@
 import fs
 
 from ._api import DataFile, DataStore, Metadata, TableType
+from ._arrow import ArrowDataStore
+from ._format import FileFormat
+from ._manifest import Manifest
 from ._opener import fs_datastore
 from ._sample import SampleFSOpener
 
 fs.opener.registry.install(SampleFSOpener)
 
 
-__all__ = ["DataFile", "DataStore", "Metadata", "TableType", "fs_datastore"]
+__all__ = [
+    "ArrowDataStore",
+    "DataFile",
+    "DataStore",
+    "FileFormat",
+    "Manifest",
+    "Metadata",
+    "TableType",
+    "fs_datastore",
+]
@@ -2,14 +2,19 @@ import io
 from abc import ABC
 from contextlib import contextmanager
 from dataclasses import dataclass
+from datetime import datetime
 from enum import Enum
 from typing import BinaryIO, Iterator
 
 import pandas as pd
 
+from ._format import FileFormat, peek, sniff_delimiter, sniff_format
+
 
 class TableType(Enum):
-    pass
+    def __reduce_ex__(self, protocol):
+        # Table types are defined by instances, which aren't equal once unpickled, so pickle by name
+        return getattr, (self.__class__, self.name)
 
 
 @dataclass
@@ -18,6 +23,8 @@ class Metadata:
     size: int
     year: int = None
     table: TableType = None
+    format: FileFormat = None
+    modified: datetime = None
 
 
 @dataclass
@@ -43,19 +50,54 @@ class DataStore(ABC):
         """
         raise NotImplementedError
 
-    def to_dataframe(self, file: [str | DataFile]) -> pd.DataFrame:
-        formats = [pd.read_csv, pd.read_excel, pd.read_json]
+    def detect_format(self, file: [str | DataFile]) -> FileFormat:
+        """
+        Detect the format of a file from its name and leading bytes
+
+        :param file: The name of the file or a DataFile object
+        """
         with self.open(file) as f:
-            if not f.seekable():
-                f = io.BytesIO(f.read())
-            length = f.seek(0, 2)  # Seek to end of file
-            if length < 2:
+            _, head = peek(f)
+        if len(head) < 2:
+            raise ValueError("File is empty")
+        return sniff_format(_name(file), head)
+
+    def to_dataframe(self, file: [str | DataFile], **kwargs) -> pd.DataFrame:
+        """
+        Read a file with the reader for its format. The format is taken from the file metadata if it
+        has already been detected, otherwise it is detected from the name and leading bytes.
+
+        :param file: The name of the file or a DataFile object
+        :param kwargs: Passed on to the pandas reader, e.g. ``nrows`` or ``usecols`` for CSV and Excel
+        """
+        metadata = getattr(file, "metadata", None)
+        file_format = metadata.format if metadata else None
+
+        with self.open(file) as f:
+            f, head = peek(f)
+            if len(head) < 2:
                 raise ValueError("File is empty")
 
-            f.seek(0, 0)
-            for fmt in formats:
-                try:
-                    return fmt(f)
-                except:
-                    pass
-        raise ValueError("Could not find a format able to read this file")
+            if file_format is None:
+                file_format = sniff_format(_name(file), head)
+
+            if file_format == FileFormat.CSV:
+                return pd.read_csv(f, sep=sniff_delimiter(head), **kwargs)
+            elif file_format == FileFormat.JSON:
+                return pd.read_json(f, **kwargs)
+            elif file_format == FileFormat.EXCEL:
+                if not f.seekable():
+                    f = io.BytesIO(f.read())
+                return pd.read_excel(f, **kwargs)
+            elif file_format in (FileFormat.PARQUET, FileFormat.ARROW):
+                from ._arrow import read_arrow
+
+                if not f.seekable():
+                    f = io.BytesIO(f.read())
+                return read_arrow(f, file_format, **kwargs)
+
+        raise ValueError(f"Unsupported file format: {file_format}")
+
+
+def _name(file: [str | DataFile]) -> str:
+    return file.name if hasattr(file, "name") else str(file)
@@ -0,0 +1,202 @@
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from fs.base import FS
+from fs.errors import NoSysPath
+
+from ._api import DataFile
+from ._format import FileFormat, sniff_format
+from ._fs import FSDataStore
+
+try:
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+ARROW_PATTERNS = ["*.parquet", "*.pq", "*.feather", "*.arrow"]
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ImportError("pyarrow is required to read Parquet and Arrow files")
+
+
+def read_table(
+    source: Any,
+    file_format: FileFormat,
+    columns: Optional[Sequence[str]] = None,
+    filters: Any = None,
+    nrows: Optional[int] = None,
+) -> "pyarrow.Table":
+    """
+    Reads a Parquet or Arrow IPC (Feather) file as an Arrow table, only reading the given columns.
+
+    Filters are given in the form accepted by :func:`pyarrow.parquet.read_table`, either as a list of
+    ``(column, op, value)`` tuples or as an expression. For Parquet they are pushed down so that row
+    groups whose statistics rule them out are skipped. A ``nrows`` of 0 only reads the schema.
+    """
+    _require_pyarrow()
+    columns = list(columns) if columns is not None else None
+
+    if file_format == FileFormat.PARQUET:
+        parquet = pyarrow.parquet.ParquetFile(source)
+        if nrows == 0:
+            table = parquet.schema_arrow.empty_table()
+        elif filters is None:
+            table = parquet.read(columns=columns)
+        else:
+            table = pyarrow.parquet.read_table(source, columns=columns, filters=filters)
+    elif file_format == FileFormat.ARROW:
+        if nrows == 0:
+            table = pyarrow.ipc.open_file(source).schema.empty_table()
+        else:
+            table = pyarrow.feather.read_table(source, columns=columns)
+        if filters is not None:
+            table = table.filter(pyarrow.parquet.filters_to_expression(filters))
+    else:
+        raise ValueError(f"Not an Arrow format: {file_format}")
+
+    if columns is not None:
+        table = table.select(columns)
+    if nrows:
+        table = table.slice(0, nrows)
+    return table
+
+
+def read_arrow(
+    source: Any,
+    file_format: FileFormat,
+    columns: Optional[Sequence[str]] = None,
+    filters: Any = None,
+    nrows: Optional[int] = None,
+    usecols: Optional[Sequence[str]] = None,
+    dtype: Optional[Mapping[str, Any]] = None,
+    arrow_backed: bool = False,
+) -> pd.DataFrame:
+    """
+    Reads a Parquet or Arrow IPC (Feather) file as a DataFrame - see :func:`read_table`.
+
+    ``usecols`` and ``dtype`` are accepted as for :func:`pandas.read_csv` so that the same read
+    arguments can be used for every format, although columns that Arrow already holds as dates are
+    left as they are. With ``arrow_backed`` the frame wraps the Arrow data rather than copying it
+    into NumPy arrays.
+    """
+    table = read_table(
+        source,
+        file_format,
+        columns=columns if columns is not None else usecols,
+        filters=filters,
+        nrows=nrows,
+    )
+    if arrow_backed:
+        df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    else:
+        df = table.to_pandas(date_as_object=False)
+
+    if dtype:
+        dtype = {
+            column: value
+            for column, value in dtype.items()
+            if column in df.columns
+            and not pd.api.types.is_datetime64_any_dtype(df[column])
+        }
+        df = df.astype(dtype)
+    return df
+
+
+def filter_dataframe(df: pd.DataFrame, filters: Any) -> pd.DataFrame:
+    """
+    Applies filters in the form accepted by :func:`read_table` to a DataFrame that has already been
+    read, e.g. from a CSV file, so that they select the same rows as they would from an Arrow file.
+    """
+    _require_pyarrow()
+    table = pyarrow.Table.from_pandas(df, preserve_index=False)
+    table = table.append_column("__row__", pyarrow.array(np.arange(len(df))))
+    rows = table.filter(pyarrow.parquet.filters_to_expression(filters))["__row__"]
+    return df.iloc[rows.to_numpy()].reset_index(drop=True)
+
+
+class ArrowDataStore(FSDataStore):
+    """
+    A datastore for Parquet and Feather/Arrow IPC files in a filesystem. Files that are on the local
+    disk are memory-mapped, so together with ``arrow_backed`` frames they are read without copying.
+
+    Column projection and filters can be passed to :meth:`to_dataframe`, e.g. to only read episodes
+    that end after a date:
+
+    >>> datastore.to_dataframe(file, columns=["CHILD", "DECOM", "DEC"], filters=[("DEC", ">=", start)])
+
+    Files in other formats, such as CSV, are read with pandas and the same projection and filters are
+    applied once they are read.
+    """
+
+    def __init__(self, filesystem: FS, patterns: Sequence[str] = tuple(ARROW_PATTERNS)):
+        _require_pyarrow()
+        super().__init__(filesystem, patterns=patterns)
+
+    @contextmanager
+    def open(self, file) -> BinaryIO:
+        filename = file.name if hasattr(file, "name") else file
+        if sniff_format(filename, b"") not in (FileFormat.PARQUET, FileFormat.ARROW):
+            with super().open(file) as f:
+                yield f
+            return
+
+        try:
+            syspath = self.filesystem.getsyspath(filename)
+        except NoSysPath:
+            with super().open(file) as f:
+                yield f
+            return
+
+        with pyarrow.memory_map(syspath) as f:
+            yield f
+
+    def to_dataframe(
+        self,
+        file: [str | DataFile],
+        columns: Optional[Sequence[str]] = None,
+        filters: Any = None,
+        arrow_backed: bool = False,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """
+        Read a file, only loading the given columns and the rows that match the filters
+
+        :param file: The name of the file or a DataFile object
+        :param columns: The columns to read, or all columns if None
+        :param filters: Row filters, see :func:`read_table`
+        :param arrow_backed: Return a frame backed by the Arrow data rather than NumPy arrays
+        """
+        metadata = getattr(file, "metadata", None)
+        file_format = metadata.format if metadata else None
+        if file_format is None:
+            file_format = self.detect_format(file)
+
+        if file_format in (FileFormat.PARQUET, FileFormat.ARROW):
+            if columns is not None:
+                kwargs["columns"] = columns
+            if filters is not None:
+                kwargs["filters"] = filters
+            if arrow_backed:
+                kwargs["arrow_backed"] = arrow_backed
+            return super().to_dataframe(file, **kwargs)
+
+        # The filters can refer to columns outside the projection, so then every column is read
+        if columns is not None and filters is None:
+            kwargs["usecols"] = list(columns)
+        df = super().to_dataframe(file, **kwargs)
+        if filters is not None:
+            df = filter_dataframe(df, filters)
+        if columns is not None:
+            df = df[list(columns)]
+        if arrow_backed:
+            df = pyarrow.Table.from_pandas(df, preserve_index=False).to_pandas(
+                types_mapper=pd.ArrowDtype
+            )
+        return df
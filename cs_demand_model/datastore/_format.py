@@ -0,0 +1,91 @@
+import csv
+import io
+from enum import Enum
+from pathlib import PurePosixPath
+from typing import BinaryIO, Tuple
+
+HEAD_SIZE = 4096
+
+_BOM = b"\xef\xbb\xbf"
+
+
+class FileFormat(Enum):
+    CSV = "csv"
+    EXCEL = "excel"
+    JSON = "json"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+
+
+_EXTENSIONS = {
+    ".csv": FileFormat.CSV,
+    ".tsv": FileFormat.CSV,
+    ".txt": FileFormat.CSV,
+    ".xlsx": FileFormat.EXCEL,
+    ".xlsm": FileFormat.EXCEL,
+    ".xls": FileFormat.EXCEL,
+    ".json": FileFormat.JSON,
+    ".parquet": FileFormat.PARQUET,
+    ".pq": FileFormat.PARQUET,
+    ".feather": FileFormat.ARROW,
+    ".arrow": FileFormat.ARROW,
+    ".ipc": FileFormat.ARROW,
+}
+
+_SIGNATURES = [
+    (b"PK\x03\x04", FileFormat.EXCEL),  # XLSX is a zip archive
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", FileFormat.EXCEL),  # Legacy XLS
+    (b"PAR1", FileFormat.PARQUET),
+    (b"ARROW1", FileFormat.ARROW),  # Arrow IPC file, also Feather V2
+    (b"FEA1", FileFormat.ARROW),  # Feather V1
+]
+
+
+def sniff_format(name: str, head: bytes) -> FileFormat:
+    """
+    Detects the format of a file from its leading bytes and name. Binary signatures are checked
+    first, then the file extension, and anything else is JSON if it starts with a brace or bracket
+    and CSV otherwise.
+    """
+    for signature, file_format in _SIGNATURES:
+        if head.startswith(signature):
+            return file_format
+
+    suffix = PurePosixPath(name or "").suffix.lower()
+    if suffix in _EXTENSIONS:
+        return _EXTENSIONS[suffix]
+
+    text = head[len(_BOM) :] if head.startswith(_BOM) else head
+    if text.lstrip()[:1] in (b"{", b"["):
+        return FileFormat.JSON
+
+    return FileFormat.CSV
+
+
+def sniff_delimiter(head: bytes, default: str = ",") -> str:
+    """
+    Detects the delimiter of a CSV file from its leading bytes, falling back to the default
+    """
+    sample = head.decode("utf-8", errors="ignore").lstrip("\ufeff")
+    # Only sniff complete lines so a truncated final row doesn't confuse the sniffer
+    if "\n" in sample:
+        sample = sample[: sample.rindex("\n")]
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return default
+
+
+def peek(f: BinaryIO, size: int = HEAD_SIZE) -> Tuple[BinaryIO, bytes]:
+    """
+    Returns the leading bytes of a stream without consuming them, together with the stream to
+    read from. Streams that can't seek are wrapped in a buffered reader rather than copied.
+    """
+    if f.seekable():
+        position = f.tell()
+        head = f.read(size)
+        f.seek(position)
+        return f, head
+
+    f = io.BufferedReader(f, buffer_size=max(size, io.DEFAULT_BUFFER_SIZE))
+    return f, f.peek(size)[:size]
@@ -1,37 +1,53 @@
 import logging
 from contextlib import contextmanager
-from typing import BinaryIO
+from typing import BinaryIO, Sequence
 
 from fs.base import FS
+from fs.osfs import OSFS
 
-from ._api import DataFile, DataStore, Metadata
+from ._api import DataFile, DataStore
+from ._manifest import Manifest
 
 logger = logging.getLogger(__name__)
 
 
+def pickle_filesystem(filesystem: FS):
+    """
+    Filesystems hold locks and can't be pickled, so local directories are pickled by their path
+    and reopened when loaded. Other filesystems are pickled as they are.
+    """
+    if type(filesystem) is OSFS:
+        return filesystem.root_path
+    return filesystem
+
+
+def unpickle_filesystem(state) -> FS:
+    return OSFS(state) if isinstance(state, str) else state
+
+
 class FSDataStore(DataStore):
-    def __init__(self, filesystem: FS):
+    """
+    A datastore for the files in a filesystem matching the given patterns. Every open returns a
+    separate handle, so files can be read from several threads at once, and stores for local
+    directories can be pickled to read them from other processes.
+    """
+
+    def __init__(self, filesystem: FS, patterns: Sequence[str] = ("*.csv",)):
         self.__filesystem = filesystem
+        self.__patterns = list(patterns)
+        self.__manifest = Manifest(filesystem, patterns=self.__patterns)
+
+    @property
+    def filesystem(self) -> FS:
+        return self.__filesystem
+
+    @property
+    def manifest(self) -> Manifest:
+        return self.__manifest
 
     @property
     def files(self) -> DataFile:
-        for info in self.__filesystem.walk.files(filter=["*.csv"]):
-            if info[0] == "/":
-                info = info[1:]
-
-            if "/" in info:
-                year, name = info.split("/")
-                yield DataFile(
-                    name=info,
-                    metadata=Metadata(
-                        name=name, size=self.__filesystem.getsize(info), year=int(year)
-                    ),
-                )
-            else:
-                yield DataFile(
-                    name=info,
-                    metadata=Metadata(name=info, size=self.__filesystem.getsize(info)),
-                )
+        yield from self.__manifest.files
 
     @contextmanager
     def open(self, file) -> BinaryIO:
@@ -39,3 +55,14 @@ class FSDataStore(DataStore):
 
         with self.__filesystem.open(filename, "rb") as f:
             yield f
+
+    def __getstate__(self):
+        return {
+            "filesystem": pickle_filesystem(self.__filesystem),
+            "patterns": self.__patterns,
+        }
+
+    def __setstate__(self, state):
+        FSDataStore.__init__(
+            self, unpickle_filesystem(state["filesystem"]), state["patterns"]
+        )
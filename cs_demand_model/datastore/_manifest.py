@@ -0,0 +1,180 @@
+import threading
+from collections import deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from fs.base import FS
+from fs.errors import ResourceNotFound
+from fs.osfs import OSFS
+from fs.path import join
+
+from ._api import DataFile, Metadata
+
+# Directory times can be this coarse, so a listing taken this soon after a change may miss it
+_MTIME_RESOLUTION = timedelta(seconds=2)
+
+
+@dataclass
+class _Directory:
+    modified: Optional[datetime]
+    scanned: datetime
+    files: Dict[str, DataFile] = field(default_factory=dict)
+    directories: List[str] = field(default_factory=list)
+
+
+class Manifest:
+    """
+    A cached listing of the files in a filesystem matching the given patterns, with their size and
+    modification time read in the same pass as the listing.
+
+    The listing is refreshed when it is read. The names in a directory are only listed again if its
+    modification time has changed, where the filesystem reports reliable directory times (local
+    directories by default), and are always listed again otherwise. The size and modification time
+    of every file are read again on each refresh, as rewriting a file doesn't change its directory,
+    unless ``restat_files`` is False because every write is followed by :meth:`invalidate`.
+    Metadata detected for a file, such as its format and table type, can be kept with :meth:`record`
+    and is dropped as soon as the size or modification time of the file changes.
+    :meth:`invalidate` forces a full listing.
+    """
+
+    def __init__(
+        self,
+        filesystem: FS,
+        patterns: Sequence[str] = ("*.csv",),
+        trust_directory_mtime: bool = None,
+        restat_files: bool = True,
+    ):
+        self.__filesystem = filesystem
+        self.__patterns = list(patterns)
+        if trust_directory_mtime is None:
+            trust_directory_mtime = isinstance(filesystem, OSFS)
+        self.__trust_directory_mtime = trust_directory_mtime
+        self.__restat_files = restat_files
+        self.__lock = threading.RLock()
+        self.__directories: Dict[str, _Directory] = {}
+
+    @property
+    def filesystem(self) -> FS:
+        return self.__filesystem
+
+    @property
+    def patterns(self) -> List[str]:
+        return list(self.__patterns)
+
+    def invalidate(self):
+        with self.__lock:
+            self.__directories = {}
+
+    @property
+    def files(self) -> List[DataFile]:
+        """
+        Returns the files in the filesystem, refreshing the listing first
+        """
+        with self.__lock:
+            self.refresh()
+            return [
+                file
+                for directory in self.__directories.values()
+                for file in directory.files.values()
+            ]
+
+    def __iter__(self) -> Iterator[DataFile]:
+        return iter(self.files)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def refresh(self):
+        with self.__lock:
+            previous, self.__directories = self.__directories, {}
+
+            # Breadth first, so files are listed in the same order as FS.walk
+            queue = deque(["/"])
+            while queue:
+                path = queue.popleft()
+                directory = self._directory(path, previous.get(path))
+                self.__directories[path] = directory
+                queue.extend(directory.directories)
+
+    def record(self, file: DataFile):
+        """
+        Keeps the metadata of a file, e.g. once its table type is detected, for as long as the file
+        is unchanged
+        """
+        with self.__lock:
+            for directory in self.__directories.values():
+                current = directory.files.get(file.name)
+                if current is None:
+                    continue
+                if (current.metadata.size, current.metadata.modified) == (
+                    file.metadata.size,
+                    file.metadata.modified,
+                ):
+                    directory.files[file.name] = file
+                return
+
+    def _directory(self, path: str, previous: Optional[_Directory]) -> _Directory:
+        now = datetime.now(timezone.utc)
+        modified = None
+        if self.__trust_directory_mtime:
+            modified = self.__filesystem.getinfo(path, namespaces=["details"]).modified
+            if (
+                previous is not None
+                and modified is not None
+                and modified == previous.modified
+                and modified < previous.scanned - _MTIME_RESOLUTION
+            ):
+                return self._restat(previous) if self.__restat_files else previous
+
+        directory = _Directory(modified=modified, scanned=now)
+        for info in self.__filesystem.scandir(path, namespaces=["details"]):
+            name = join(path, info.name)
+            if info.is_dir:
+                directory.directories.append(name)
+            elif self.__filesystem.match(self.__patterns, info.name):
+                file = self._data_file(name.lstrip("/"), info.size, info.modified)
+                if previous is not None:
+                    file = self._unchanged(previous.files.get(file.name), file)
+                directory.files[file.name] = file
+        return directory
+
+    def _restat(self, previous: _Directory) -> _Directory:
+        """
+        Reads the details of the files in a directory whose names haven't changed
+        """
+        directory = replace(previous, files={})
+        for name, file in previous.files.items():
+            try:
+                info = self.__filesystem.getinfo(name, namespaces=["details"])
+            except ResourceNotFound:
+                continue
+            directory.files[name] = self._unchanged(
+                file, self._data_file(name, info.size, info.modified)
+            )
+        return directory
+
+    @staticmethod
+    def _data_file(name: str, size: int, modified: datetime) -> DataFile:
+        if "/" in name:
+            year, filename = name.split("/", 1)
+            metadata = Metadata(
+                name=filename, size=size, year=int(year), modified=modified
+            )
+        else:
+            metadata = Metadata(name=name, size=size, modified=modified)
+        return DataFile(name=name, metadata=metadata)
+
+    @staticmethod
+    def _unchanged(previous: Optional[DataFile], file: DataFile) -> DataFile:
+        """
+        Returns the previous entry, with any recorded metadata, if the file hasn't changed
+        """
+        if previous is None or file.metadata.modified is None:
+            return file
+        if (previous.metadata.size, previous.metadata.modified) != (
+            file.metadata.size,
+            file.metadata.modified,
+        ):
+            return file
+        return previous
@@ -1,3 +1,4 @@
+import io
 import logging
 from pathlib import Path
 from tempfile import TemporaryDirectory
@@ -11,8 +12,9 @@ from fs.opener.parse import parse_fs_url
 from fs.osfs import OSFS
 
 from cs_demand_model.datastore import DataStore
+from cs_demand_model.datastore._arrow import ARROW_PATTERNS, ArrowDataStore, pyarrow
 from cs_demand_model.datastore._fs import FSDataStore
-from cs_demand_model.datastore._zip import ZipDataStore
+from cs_demand_model.datastore._zip import FSZipDataStore, ZipDataStore
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +23,8 @@ def fs_datastore(fs_url) -> DataStore:
     # Url can be a valid filesystem url or a filesystem url + a filename
     fs, file = _fs_from_url(fs_url)
     if file is None:
+        if pyarrow and next(iter(fs.walk.files(filter=ARROW_PATTERNS)), None):
+            return ArrowDataStore(fs, patterns=ARROW_PATTERNS + ["*.csv"])
         return FSDataStore(fs)
     return create_zip_store(fs, file)
 
@@ -58,6 +62,11 @@ def create_zip_store(path: FS, file: str) -> DataStore:
     except NoSysPath:
         pass
 
+    try:
+        return FSZipDataStore(path, file)
+    except io.UnsupportedOperation:
+        pass
+
     return TmpZipDataStore(path, file)
 
 
@@ -75,3 +84,11 @@ class TmpZipDataStore(ZipDataStore):
         )
         copy.copy_file(path, file, dest_fs, file)
         super().__init__(Path(tmpdir.name) / file)
+
+    def close(self):
+        super().close()
+        self.__tmpdir.cleanup()
+
+    def __reduce__(self):
+        # Copies read the extracted archive but leave removing it to the original
+        return ZipDataStore, (self.path,)
@@ -1,34 +1,141 @@
+import io
+import threading
 from contextlib import contextmanager
-from pathlib import Path
-from typing import BinaryIO
-from zipfile import ZipFile
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Dict, Optional
+from zipfile import ZipFile, ZipInfo
+
+from fs.base import FS
 
 from ._api import DataFile, DataStore, Metadata
+from ._fs import pickle_filesystem, unpickle_filesystem
 
 
 class ZipDataStore(DataStore):
+    """
+    A datastore for the files in a zip archive. The archive is opened and its members indexed once,
+    and the handle is shared by every file opened from the store. Members are decompressed as they
+    are read, so files are streamed into the parsers rather than extracted first.
+
+    The store can be used as a context manager to close the archive when done, and it is safe to
+    read several members from different threads at once.
+    """
+
     def __init__(self, path):
         self.path = Path(path)
         if not self.path.exists():
             raise FileNotFoundError(f"File not found: {self.path}")
+        self._reset()
+
+    def _reset(self):
+        self.__lock = threading.Lock()
+        self.__zip: Optional[ZipFile] = None
+        self.__members: Optional[Dict[str, ZipInfo]] = None
+
+    def _open_zip(self) -> ZipFile:
+        return ZipFile(self.path, "r")
+
+    def _archive(self) -> ZipFile:
+        with self.__lock:
+            if self.__zip is None:
+                self.__zip = self._open_zip()
+                self.__members = {
+                    info.filename: info
+                    for info in self.__zip.infolist()
+                    if not info.is_dir()
+                }
+            return self.__zip
+
+    @property
+    def members(self) -> Dict[str, ZipInfo]:
+        self._archive()
+        return self.__members
 
     @property
     def files(self) -> DataFile:
-        with ZipFile(self.path, "r") as zip:
-            for info in zip.infolist():
-                if not info.is_dir():
-                    year, name = info.filename.split("/")
-                    yield DataFile(
-                        name=info.filename,
-                        metadata=Metadata(
-                            name=name, size=info.file_size, year=int(year)
-                        ),
-                    )
+        for name, info in self.members.items():
+            if "/" in name:
+                year, filename = name.split("/", 1)
+                yield DataFile(
+                    name=name,
+                    metadata=Metadata(
+                        name=filename, size=info.file_size, year=int(year)
+                    ),
+                )
+            else:
+                yield DataFile(
+                    name=name, metadata=Metadata(name=name, size=info.file_size)
+                )
 
     @contextmanager
     def open(self, file) -> BinaryIO:
         filename = file.name if hasattr(file, "name") else file
 
-        with ZipFile(self.path, "r") as zip:
-            with zip.open(filename) as f:
-                yield f
+        archive = self._archive()
+        info = self.__members.get(filename)
+        if info is None:
+            raise FileNotFoundError(f"File not found in {self.path}: {filename}")
+
+        # ZipFile locks reads from the shared handle, but not opening a member
+        with self.__lock:
+            f = archive.open(info)
+        with f:
+            yield f
+
+    def close(self):
+        with self.__lock:
+            if self.__zip is not None:
+                self.__zip.close()
+            self.__zip = None
+            self.__members = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __getstate__(self):
+        # Open handles and locks can't be pickled, so a copy opens the archive again when used
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        ZipDataStore.__init__(self, state["path"])
+
+
+class FSZipDataStore(ZipDataStore):
+    """
+    A zip datastore for an archive in a filesystem without local paths, such as a network mount.
+
+    The archive is read through a seekable handle from the filesystem, so only the central directory
+    and the members that are actually read are fetched rather than copying the whole archive.
+    """
+
+    def __init__(self, filesystem: FS, file: str):
+        self.filesystem = filesystem
+        self.file = file
+        self.path = PurePosixPath(file)
+        self.__handle = None
+
+        with filesystem.openbin(file) as f:
+            if not f.seekable():
+                raise io.UnsupportedOperation(f"{file} does not support seeking")
+        self._reset()
+
+    def _open_zip(self) -> ZipFile:
+        self.__handle = self.filesystem.openbin(self.file)
+        return ZipFile(self.__handle, "r")
+
+    def close(self):
+        super().close()
+        if self.__handle is not None:
+            self.__handle.close()
+            self.__handle = None
+
+    def __getstate__(self):
+        return {"filesystem": pickle_filesystem(self.filesystem), "file": self.file}
+
+    def __setstate__(self, state):
+        FSZipDataStore.__init__(
+            self, unpickle_filesystem(state["filesystem"]), state["file"]
+        )
@@ -1,112 +1,402 @@
 from datetime import date
-from functools import lru_cache
+from functools import cached_property
+from typing import Iterable, NamedTuple, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+from cs_demand_model._cache import cached_method
 from cs_demand_model.config import Config
 
 
+class DailyTransitions(NamedTuple):
+    """
+    The daily number of transitions between each pair of (age_bin, placement_type) bins, stored
+    sparsely as coordinates: each entry is a day and pair with any transitions, given as positions in
+    ``index`` and ``columns``, and the number of transitions. Entries are sorted by pair and then day.
+    """
+
+    index: pd.DatetimeIndex
+    columns: pd.MultiIndex
+    day: np.ndarray
+    pair: np.ndarray
+    count: np.ndarray
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns the transitions as a dense frame with a row for every day
+        """
+        values = np.zeros((len(self.index), len(self.columns)))
+        values[self.day, self.pair] = self.count
+        return pd.DataFrame(values, index=self.index, columns=self.columns)
+
+
+class _RateSums(NamedTuple):
+    index: pd.DatetimeIndex
+    columns: pd.MultiIndex
+    stock: np.ndarray
+    start: np.ndarray
+    keys: np.ndarray
+    transitions: np.ndarray
+    rates: np.ndarray
+    infinite: np.ndarray
+    finite_sums: np.ndarray
+    infinite_sums: np.ndarray
+
+    def key(self, day, pair):
+        """
+        The sort key of the entries for a day and pair, a position in ``index`` and ``columns``
+        """
+        return pair * (len(self.index) + 1) + day
+
+    def lookup(self, values: np.ndarray, day, pair) -> np.ndarray:
+        """
+        The values of the entries for each day and pair, or zero where there are none
+        """
+        key = self.key(day, pair)
+        position = np.minimum(self.keys.searchsorted(key), len(self.keys) - 1)
+        found = self.keys[position] == key if len(self.keys) else np.zeros_like(key)
+        return np.where(found, values[position] if len(values) else 0, 0)
+
+    def window_sums(self, sums: np.ndarray, starts, ends, pair) -> np.ndarray:
+        """
+        The sums of the entries for each pair over the days from starts up to but excluding ends
+        """
+        # Each pair's sums start with a zero, so are offset by the pair's position
+        return (
+            sums[self.keys.searchsorted(self.key(ends, pair)) + pair]
+            - sums[self.keys.searchsorted(self.key(starts, pair)) + pair]
+        )
+
+
 class PopulationStats:
-    def __init__(self, df: pd.DataFrame, config: Config):
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        config: Config,
+        cache_size: Optional[int] = 5,
+        cache_eviction: str = "lru",
+    ):
+        """
+        :param df: The enriched view of the episodes
+        :param config: The model configuration
+        :param cache_size: How many results to keep for each of the date-dependent methods
+                           (None for unbounded, 0 to disable caching)
+        :param cache_eviction: Which result to discard when the cache is full, either "lru" or "fifo"
+        """
         self.__df = df
         self.__config = config
+        self.__cache_size = cache_size
+        self.__cache_eviction = cache_eviction
 
     @property
     def df(self):
         return self.__df
 
+    def invalidate(self):
+        """
+        Discards the cached stock and transitions (and anything derived from them) so that they are
+        recalculated on next access. Use this if the underlying dataframe has been modified in place.
+        """
+        for name in ["stock", "daily_transitions", "transitions", "_daily_rate_sums"]:
+            self.__dict__.pop(name, None)
+        self.stock_at.cache_clear()
+        self.raw_transition_rates.cache_clear()
+        self.daily_entrants.cache_clear()
+
     @property
     def config(self) -> Config:
         return self.__config
 
     @property
-    def stock(self):
+    def cache_size(self) -> Optional[int]:
+        return self.__cache_size
+
+    @property
+    def cache_eviction(self) -> str:
+        return self.__cache_eviction
+
+    def cache_info(self) -> dict:
         """
-        Calculates the daily transitions for each age bin and placement type by
-        finding all the transitions (start or end of episode), summing to get total populations for each
-        day and then resampling to get the daily populations.
+        Returns the hit/miss statistics for each of the cached methods
         """
-        df = self.df.copy()
-        df["bin"] = df.apply(lambda c: (c.age_bin.name, c.placement_type.name), axis=1)
-        endings = df.groupby(["DEC", "bin"]).size()
-        endings.name = "nof_decs"
+        return {
+            name: getattr(self, name).cache_info()
+            for name in ["stock_at", "raw_transition_rates", "daily_entrants"]
+        }
 
-        beginnings = df.groupby(["DECOM", "bin"]).size()
-        beginnings.name = "nof_decoms"
-
-        endings.index.names = ["date", "bin"]
-        beginnings.index.names = ["date", "bin"]
+    def _bin_codes(self, df: pd.DataFrame, placement_column="placement_type"):
+        """
+        Encodes the age bin and the given placement type column of each row as a single integer,
+        so we can group on a plain integer column rather than building tuples for every row.
 
-        pops = pd.merge(
-            left=beginnings,
-            right=endings,
-            left_index=True,
-            right_index=True,
-            how="outer",
+        Rows without an age bin (ages outside the brackets) or placement type are given -1 and should
+        be left out by the caller.
+        """
+        AgeBrackets = self.__config.AgeBrackets
+        PlacementCategories = self.__config.PlacementCategories
+        age_bin = pd.Categorical(df["age_bin"], categories=list(AgeBrackets))
+        placement_type = pd.Categorical(
+            df[placement_column], categories=list(PlacementCategories)
         )
+        codes = age_bin.codes.astype(int) * len(PlacementCategories)
+        codes = codes + placement_type.codes
+        codes[(age_bin.codes < 0) | (placement_type.codes < 0)] = -1
+        return pd.Series(codes, index=df.index)
 
-        pops = pops.fillna(0).sort_values("date")
-
-        pops = (pops["nof_decoms"] - pops["nof_decs"]).groupby(["bin"]).cumsum()
-
-        pops = pops.unstack(level=1)
-
-        # Resample to daily counts and forward-fill in missing days
-        pops = pops.resample("D").first().fillna(method="ffill").fillna(0)
+    def _bin_labels(self, codes) -> pd.Index:
+        """
+        Converts the codes from :meth:`_bin_codes` back to (age_bin, placement_type) name tuples
+        """
+        age_brackets = list(self.__config.AgeBrackets)
+        placement_categories = list(self.__config.PlacementCategories)
+        size = len(placement_categories)
+        return pd.Index(
+            [
+                (age_brackets[c // size].name, placement_categories[c % size].name)
+                for c in codes
+            ],
+            tupleize_cols=False,
+        )
 
-        # Add the missing age bins and fill with zeros
-        # pops = pops.T.reindex(self.__config.states(as_index=True)).T.fillna(0)
+    @cached_property
+    def stock(self):
+        """
+        Calculates the daily population for each age bin and placement type. Each episode adds one
+        to its bin on its start date and removes one on its end date, so the events are counted for
+        each day from the first event to the last and the counts summed over the days.
 
-        return pops
+        This is calculated once per instance - see :meth:`invalidate`. The returned frame is shared,
+        so take a copy before modifying it.
+        """
+        bins = self._bin_codes(self.df).values
+        binned = bins >= 0
+        bins = bins[binned]
+        decom = self.df["DECOM"].values[binned].astype("datetime64[D]")
+        dec = self.df["DEC"].values[binned].astype("datetime64[D]")
+        ended = ~np.isnat(dec)
+
+        # Label and sort the (small) set of bins before counting, so the counts are in column order
+        codes, bin_index = np.unique(bins, return_inverse=True)
+        labels, order = self._bin_labels(codes).sort_values(return_indexer=True)
+        labels = labels.rename("bin")
+        column = np.empty_like(order)
+        column[order] = np.arange(len(order))
+        column = column[bin_index]
+
+        first = min(decom.min(), dec[ended].min(initial=decom.max()))
+        last = max(decom.max(), dec[ended].max(initial=decom.min()))
+        days = (last - first).astype(int) + 1
+        width = len(labels)
+
+        def count(dates, columns):
+            offsets = (dates - first).astype(np.int64) * width + columns
+            return np.bincount(offsets, minlength=days * width)
+
+        events = count(decom, column) - count(dec[ended], column[ended])
+        pops = np.cumsum(events.reshape(days, width), axis=0, dtype=np.float64)
+
+        return pd.DataFrame(
+            pops,
+            index=pd.date_range(first, periods=days, freq="D", name="date"),
+            columns=labels,
+        )
 
-    @lru_cache(maxsize=5)
+    @cached_method
     def stock_at(self, start_date):
         start_date = pd.to_datetime(start_date)
 
+        # The stock index is sorted, so this is a binary search on the cached stock
         index = self.stock.index.get_indexer([start_date], method="nearest")
 
-        stock = self.stock.iloc[index[0]].T
-        stock.name = start_date
-        return stock
+        # Copy the row and its labels, so the cached stock isn't changed through the result
+        return pd.Series(
+            self.stock.values[index[0]].copy(),
+            index=self.stock.columns.copy(),
+            name=start_date,
+        )
 
-    @property
+    @cached_property
+    def daily_transitions(self) -> DailyTransitions:
+        """
+        The daily number of transitions between each pair of (age_bin, placement_type) bins, stored
+        sparsely as only a few transitions happen on any day.
+
+        This is calculated once per instance - see :meth:`invalidate`.
+        """
+        df = self.df[self.df["DEC"].notna()]
+        start_bin = self._bin_codes(df).values
+        end_bin = self._bin_codes(df, placement_column="placement_type_after").values
+        binned = (start_bin >= 0) & (end_bin >= 0)
+        start_bin, end_bin = start_bin[binned], end_bin[binned]
+        dec = df["DEC"].values[binned].astype("datetime64[D]")
+
+        # Label and sort the (small) set of pairs before counting, so the pairs are in column order
+        pairs, pair_index = np.unique(
+            np.stack([start_bin, end_bin]), axis=1, return_inverse=True
+        )
+        columns = pd.MultiIndex.from_arrays(
+            [self._bin_labels(pairs[0]), self._bin_labels(pairs[1])],
+            names=["start_bin", "end_bin"],
+        )
+        columns, order = columns.sort_values(return_indexer=True)
+        column = np.empty_like(order)
+        column[order] = np.arange(len(order))
+        column = column[pair_index.reshape(-1)]
+
+        if len(dec):
+            first = dec.min()
+            days = (dec.max() - first).astype(int) + 1
+            index = pd.date_range(first, periods=days, freq="D", name="DEC")
+        else:
+            first, days = np.datetime64(0, "D"), 0
+            index = pd.DatetimeIndex([], freq="D", name="DEC")
+        day = (dec - first).astype(np.int64)
+
+        keys, count = np.unique(column * (days + 1) + day, return_counts=True)
+        return DailyTransitions(
+            index=index,
+            columns=columns,
+            day=keys % (days + 1),
+            pair=keys // (days + 1),
+            count=count.astype(np.float64),
+        )
+
+    @cached_property
     def transitions(self):
-        transitions = self.df.copy()
-        transitions["start_bin"] = transitions.apply(
-            lambda c: (c.age_bin.name, c.placement_type.name), axis=1
+        """
+        The daily number of transitions between each pair of (age_bin, placement_type) bins as a dense
+        frame, built from :attr:`daily_transitions`.
+
+        This is calculated once per instance - see :meth:`invalidate`. The returned frame is shared,
+        so take a copy before modifying it.
+        """
+        return self.daily_transitions.to_frame()
+
+    @cached_property
+    def _daily_rate_sums(self) -> _RateSums:
+        """
+        Prefix sums of the daily transition rates (transitions divided by the previous day's stock)
+        for each pair of bins, so that the total rate over any window is the difference of two sums.
+        Only the days with transitions are stored, as the rate is zero on the other days.
+
+        Infinite rates (transitions out of a bin that was empty the day before) are counted separately
+        so that they only affect the windows that contain them.
+        """
+        stock = self.stock
+        transitions = self.daily_transitions
+
+        # Move the transitions onto the days of the stock, which covers every episode
+        offset = (
+            (transitions.index[0] - stock.index[0]).days
+            if len(transitions.index)
+            else 0
         )
-        transitions["end_bin"] = transitions.apply(
-            lambda c: (c.age_bin.name, c.placement_type_after.name), axis=1
+        day = transitions.day + offset
+        start = stock.columns.get_indexer(
+            transitions.columns.get_level_values("start_bin")
         )
-        transitions = transitions.groupby(["start_bin", "end_bin", "DEC"]).size()
-        transitions = (
-            transitions.unstack(level=["start_bin", "end_bin"])
-            .fillna(0)
-            .asfreq("D", fill_value=0)
+
+        previous = np.full(len(day), np.nan)
+        has_previous = day > 0
+        previous[has_previous] = stock.values[
+            day[has_previous] - 1, start[transitions.pair[has_previous]]
+        ]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = transitions.count / previous
+        infinite = np.isinf(rates)
+        finite_rates = np.where(np.isnan(rates) | infinite, 0, rates)
+
+        # A separate running sum for each pair, so each is only rounded by its own rates
+        bounds = transitions.pair.searchsorted(np.arange(len(transitions.columns) + 1))
+
+        def prefix(values):
+            sums = np.zeros(len(values) + len(transitions.columns))
+            for pair, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+                np.cumsum(values[lo:hi], out=sums[lo + pair + 1 : hi + pair + 1])
+            return sums
+
+        sums = _RateSums(
+            index=stock.index,
+            columns=transitions.columns,
+            stock=stock.values,
+            start=start,
+            keys=None,
+            transitions=transitions.count,
+            rates=finite_rates,
+            infinite=infinite,
+            finite_sums=prefix(finite_rates),
+            infinite_sums=prefix(infinite),
         )
+        return sums._replace(keys=sums.key(day, transitions.pair))
+
+    def raw_transition_rates_for_windows(
+        self, windows: Iterable[Tuple[date, date]]
+    ) -> pd.DataFrame:
+        """
+        Calculates the mean daily transition rates for many (start_date, end_date) reference windows
+        at once. Each window costs a difference of two rows of precomputed prefix sums.
 
-        return transitions
+        :return: A DataFrame with a row for each window and a column for each transition
+        """
+        sums = self._daily_rate_sums
+        windows = [(pd.to_datetime(s), pd.to_datetime(e)) for s, e in windows]
+        for start_date, end_date in windows:
+            if start_date > end_date:
+                raise ValueError(
+                    f"Start date {start_date} must be before end date {end_date}"
+                )
+
+        starts = sums.index.searchsorted([s for s, _ in windows], side="left")
+        ends = sums.index.searchsorted([e for _, e in windows], side="right")
+        days = ends - starts
+
+        # Every window against every pair
+        pair = np.arange(len(sums.columns))[np.newaxis, :]
+        starts, ends = starts[:, np.newaxis], ends[:, np.newaxis]
+
+        total = sums.window_sums(sums.finite_sums, starts, ends, pair)
+        infinite = sums.window_sums(sums.infinite_sums, starts, ends, pair)
+
+        # Within a window the first day has no previous day, so it is divided by its own stock
+        # rather than the previous day's stock
+        first = np.minimum(starts, len(sums.index) - 1)
+        has_first = (days > 0)[:, np.newaxis]
+        total -= np.where(has_first, sums.lookup(sums.rates, first, pair), 0)
+        infinite -= np.where(has_first, sums.lookup(sums.infinite, first, pair), 0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            first_rates = (
+                sums.lookup(sums.transitions, first, pair)
+                / sums.stock[first, sums.start[pair]]
+            )
+        first_rates = np.where((days > 1)[:, np.newaxis], first_rates, np.nan)
+        total += np.where(np.isfinite(first_rates), first_rates, 0)
+        infinite += np.isinf(first_rates)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = total / days[:, np.newaxis]
+        means = np.where(infinite > 0, np.inf, means)
+
+        return pd.DataFrame(
+            means,
+            index=pd.MultiIndex.from_tuples(windows, names=["start_date", "end_date"]),
+            columns=sums.columns,
+        )
 
-    @lru_cache(maxsize=5)
+    @cached_method
     def raw_transition_rates(self, start_date: date, end_date: date):
-        # Ensure we can calculate the transition rates by aligning the dataframes
-        stock = self.stock.truncate(before=start_date, after=end_date)
-        stock.columns.name = "start_bin"
-        transitions = self.transitions.truncate(before=start_date, after=end_date)
-
-        # Calculate the transition rates
-        stock, transitions = stock.align(transitions)
-        transition_rates = transitions / stock.shift(1).fillna(method="bfill")
-        transition_rates = transition_rates.fillna(0)
-
-        # Use the mean rates
-        transition_rates = transition_rates.mean(axis=0)
+        """
+        The mean daily transition rates between the start and end dates (inclusive)
+        """
+        transition_rates = self.raw_transition_rates_for_windows(
+            [(start_date, end_date)]
+        ).iloc[0]
         transition_rates.name = "transition_rate"
 
         return transition_rates
 
-    @lru_cache(maxsize=5)
+    @cached_method
     def daily_entrants(self, start_date: date, end_date: date) -> pd.Series:
         """
         Returns the number of entrants and the daily_probability of entrants for each age bracket and placement type.
@@ -118,16 +408,16 @@ class PopulationStats:
         df = self.df
 
         # Only look at episodes starting in analysis period
-        df = df[(df["DECOM"] >= start_date) & (df["DECOM"] <= end_date)].copy()
-
-        df["to"] = df.apply(lambda c: (c.age_bin.name, c.placement_type.name), axis=1)
+        df = df[(df["DECOM"] >= start_date) & (df["DECOM"] <= end_date)]
+        df = df[df["placement_type_before"] == PlacementCategories.NOT_IN_CARE]
 
         # Group by age bin and placement type
-        df = (
-            df[df["placement_type_before"] == PlacementCategories.NOT_IN_CARE]
-            .groupby(["to"])
-            .size()
-        )
+        codes = self._bin_codes(df)
+        codes = codes[codes >= 0]
+        df = codes.groupby(codes).size()
+        df.index = self._bin_labels(df.index)
+        df = df.sort_index()
+        df.index.name = "to"
         df.name = "entrants"
 
         # Reset index
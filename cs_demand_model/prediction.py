@@ -216,7 +216,9 @@ class ModelPredictor:
             for adjustment in number_adjustment:
                 adjustment = adjustment.copy()
                 adjustment.index.names = ["from", "to"]
-                daily_entrants, adjustment = daily_entrants.align(adjustment)
+                daily_entrants, adjustment = daily_entrants.align(
+                    adjustment, fill_value=0
+                )
                 daily_entrants = daily_entrants + adjustment
                 daily_entrants.index.names = ["from", "to"]
 
@@ -226,7 +228,9 @@ class ModelPredictor:
             for adjustment in rate_adjustment:
                 adjustment = adjustment.copy()
                 adjustment.index.names = ["from", "to"]
-                transition_rates, adjustment = transition_rates.align(adjustment)
+                transition_rates, adjustment = transition_rates.align(
+                    adjustment, fill_value=0
+                )
                 transition_rates = transition_rates + adjustment
                 transition_rates.index.names = ["from", "to"]
 
@@ -235,7 +239,7 @@ class ModelPredictor:
             prediction_start = reference_end
 
         return ModelPredictor(
-            population=model.stock_at(prediction_start),
+            population=model.stock_at(prediction_start).copy(),
             transition_rates=transition_rates,
             transition_numbers=daily_entrants,
             start_date=prediction_start,
@@ -1,13 +1,14 @@
 import inspect
+import os
 import tempfile
 from datetime import date, datetime, timedelta
-from functools import lru_cache
 from math import ceil
 from pathlib import Path
 from typing import Mapping, Optional
 
 import pandas as pd
 from dateutil.relativedelta import relativedelta
+from fs.osfs import OSFS
 from prpc_python import RemoteFile
 
 from cs_demand_model import (
@@ -15,9 +16,12 @@ from cs_demand_model import (
     DemandModellingDataContainer,
     ModelPredictor,
     PopulationStats,
+    ScenarioPredictor,
     fs_datastore,
 )
-from cs_demand_model.datastore import DataStore
+from cs_demand_model._cache import BoundedCache
+from cs_demand_model._view_cache import CACHE_DIR_ENVVAR
+from cs_demand_model.datastore import DataStore, Manifest
 
 
 def state_property(*dec_args, **dec_kwargs):
@@ -25,8 +29,8 @@ def state_property(*dec_args, **dec_kwargs):
         signature = inspect.signature(func)
         param_list = list(signature.parameters.values())[1:]
 
-        if dec_kwargs.get("cache", 0):
-            func = lru_cache(maxsize=int(dec_kwargs["cache"]))(func)
+        cache_size = int(dec_kwargs.get("cache", 0))
+        cache_attribute = f"_state_property_cache_{func.__name__}"
 
         def wrapper(state):
             args = []
@@ -35,7 +39,15 @@ def state_property(*dec_args, **dec_kwargs):
                 if state_value is None:
                     return None
                 args.append(state_value)
-            return func(state, *args)
+
+            if not cache_size:
+                return func(state, *args)
+
+            # The cache lives on the state object so it is released with the state
+            cache = state.__dict__.get(cache_attribute)
+            if cache is None:
+                cache = state.__dict__[cache_attribute] = BoundedCache(cache_size)
+            return cache.get(tuple(args), lambda: func(state, *args))
 
         return property(wrapper)
 
@@ -134,6 +146,10 @@ class DemandModellingState:
         }
         self.__temp_folder = tempfile.TemporaryDirectory()
         self.__temp_folder_path = Path(self.__temp_folder.name)
+        # Every write to the temp folder goes through add_file, which invalidates the manifest
+        self.__temp_manifest = Manifest(
+            OSFS(self.__temp_folder.name), patterns=["*"], restat_files=False
+        )
 
         self.datastore_ready = False
         self.__datastore = None
@@ -170,14 +186,13 @@ class DemandModellingState:
             file_path = self.__temp_folder_path / f"{id}.csv"
             with file_path.open("wb") as f:
                 f.write(file.read())
+            self.__temp_manifest.invalidate()
 
     @property
     def files(self):
         return {
-            f.name: dict(
-                file=dict(name=f.name.rsplit("_", 2)[0], size=f.stat().st_size)
-            )
-            for f in self.__temp_folder_path.iterdir()
+            f.name: dict(file=dict(name=f.name.rsplit("_", 2)[0], size=f.metadata.size))
+            for f in self.__temp_manifest.files
         }
 
     @state_property(cache=1)
@@ -186,7 +201,9 @@ class DemandModellingState:
     ) -> Optional[DemandModellingDataContainer]:
         if not datastore_ready:
             return None
-        return DemandModellingDataContainer(datastore, config)
+        return DemandModellingDataContainer(
+            datastore, config, cache_dir=os.environ.get(CACHE_DIR_ENVVAR)
+        )
 
     @state_property(cache=1)
     def population_stats(
@@ -261,48 +278,50 @@ class DemandModellingState:
         return ceil((self.prediction_end_date - self.end_date).days / self.step_days)
 
     @state_property(cache=1)
-    def prediction(
+    def predictions(
         self,
         population_stats,
+        adjustments,
         start_date,
         end_date,
         prediction_start_date,
         steps: int,
         step_days: int,
     ) -> Optional[pd.DataFrame]:
+        """
+        The base and adjusted forecasts, run together as scenarios indexed by scenario and date
+        """
         if "start_date" in self.errors or "end_date" in self.errors:
             return None
-        predictor = ModelPredictor.from_model(
-            population_stats, start_date, end_date, prediction_start_date
-        )
-        return predictor.predict(steps, step_days)
 
-    @state_property(cache=1)
-    def prediction_adjusted(
-        self,
-        population_stats,
-        adjustments,
-        start_date,
-        end_date,
-        steps: int,
-        step_days: int,
-    ) -> Optional[pd.DataFrame]:
-        if not adjustments or adjustments.transition_rates is None:
-            return None
+        scenarios = {"base": None}
+        if adjustments and adjustments.transition_rates is not None:
+            scenarios["adjusted"] = adjustments.transition_rates
 
-        if "start_date" in self.errors or "end_date" in self.errors:
-            return None
-
-        predictor = ModelPredictor.from_model(
+        predictor = ScenarioPredictor.from_model(
             population_stats,
             start_date,
             end_date,
-            prediction_start=self.prediction_start_date,
-            rate_adjustment=adjustments.transition_rates,
+            scenarios,
+            prediction_start=prediction_start_date,
+            exact_steps=True,
         )
-
         return predictor.predict(steps, step_days)
 
+    @property
+    def prediction(self) -> Optional[pd.DataFrame]:
+        predictions = self.predictions
+        if predictions is None:
+            return None
+        return predictions.loc["base"]
+
+    @property
+    def prediction_adjusted(self) -> Optional[pd.DataFrame]:
+        predictions = self.predictions
+        if predictions is None or "adjusted" not in predictions.index.levels[0]:
+            return None
+        return predictions.loc["adjusted"]
+
     @state_property
     def costs(self, config):
         if self.__costs is None:
@@ -0,0 +1,324 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from cs_demand_model.config import Config
+from cs_demand_model.population_stats import PopulationStats
+from cs_demand_model.prediction import ModelPredictor
+from cs_demand_model.transition_matrix import TransitionMatrix
+
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def _step_rates(rates: np.ndarray, numbers: np.ndarray, days: int):
+    if days > 1:
+        rates = 1 - (1 - rates) ** days
+        numbers = numbers * days
+    return np.clip(rates, 0, None), np.clip(numbers, 0, None)
+
+
+def sample_step(
+    rng: np.random.Generator,
+    rates: np.ndarray,
+    numbers: np.ndarray,
+    population: np.ndarray,
+) -> np.ndarray:
+    """
+    Draws the next population for a (paths x states) array of integer populations.
+
+    Each child in a state either stays or moves to another state (including out of care) with a
+    single multinomial draw per state, using the same rates as
+    :func:`cs_demand_model.transition_matrix.transition_step`. Entrants from outside of care are
+    drawn from a Poisson distribution.
+    """
+    size = population.shape[-1]
+
+    # Numbers are converted to rates based on the population of each path
+    number_rates = np.divide(
+        numbers[:-1],
+        population[..., np.newaxis],
+        out=np.zeros(population.shape + (size + 1,)),
+        where=population[..., np.newaxis] != 0,
+    )
+    state_rates = rates[:-1] + number_rates
+
+    out_rate = state_rates.sum(axis=-1)
+    leave = np.where(out_rate > 0, np.minimum(out_rate, 1), 0)
+    with np.errstate(invalid="ignore"):
+        fraction = np.divide(
+            state_rates,
+            out_rate[..., np.newaxis],
+            out=np.zeros_like(state_rates),
+            where=out_rate[..., np.newaxis] > 0,
+        )
+
+    # Where the rate out is infinite everyone leaves, but as in transition_step the split is
+    # undefined so nobody arrives anywhere, i.e. they all leave care
+    undefined = ~np.isfinite(fraction).all(axis=-1)
+    fraction[undefined] = 0
+    fraction[undefined, -1] = 1
+
+    pvals = np.concatenate(
+        [fraction * leave[..., np.newaxis], 1 - leave[..., np.newaxis]], axis=-1
+    )
+    pvals = np.clip(pvals, 0, 1)
+
+    moves = rng.multinomial(population, pvals)
+    entrants = rng.poisson(rates[-1, :-1] + numbers[-1, :-1], size=population.shape)
+    return moves[..., -1] + moves[..., :size].sum(axis=-2) + entrants
+
+
+def simulate_paths(
+    rates: np.ndarray,
+    numbers: np.ndarray,
+    population: np.ndarray,
+    paths: int,
+    steps: int,
+    step_days: int = 1,
+    seed=None,
+) -> np.ndarray:
+    """
+    Simulates a number of sample paths from an initial population vector, returning a
+    (paths x steps x states) array of populations.
+    """
+    rng = np.random.default_rng(seed)
+    rates, numbers = _step_rates(rates, numbers, step_days)
+
+    current = np.broadcast_to(
+        np.rint(population).astype(np.int64), (paths, len(population))
+    )
+    samples = np.empty((paths, steps, len(population)), dtype=np.int32)
+    for i in range(steps):
+        current = sample_step(rng, rates, numbers, current)
+        samples[:, i] = current
+    return samples
+
+
+def count_populations(samples: np.ndarray) -> np.ndarray:
+    """
+    Reduces a (paths x steps x states) array of populations to a (steps x states x values) array
+    of the number of paths with each population, up to the largest population in the samples.
+    """
+    steps, states = samples.shape[1:]
+    width = int(samples.max(initial=0)) + 1
+    cells = np.arange(steps * states, dtype=np.int64).reshape(steps, states) * width
+    counts = np.bincount((samples + cells).ravel(), minlength=steps * states * width)
+    return counts.reshape(steps, states, width)
+
+
+def add_counts(total: Optional[np.ndarray], counts: np.ndarray) -> np.ndarray:
+    """
+    Adds two arrays of counts from :func:`count_populations`, which can cover different ranges of
+    populations
+    """
+    if total is None:
+        return counts
+    if total.shape[-1] < counts.shape[-1]:
+        total, counts = counts, total
+    total = total.copy()
+    total[..., : counts.shape[-1]] += counts
+    return total
+
+
+def count_quantiles(counts: np.ndarray, quantiles: Sequence[float]) -> np.ndarray:
+    """
+    Returns a (quantiles x steps x states) array of the quantiles of the populations counted by
+    :func:`count_populations`, interpolating linearly as :func:`numpy.quantile` does by default.
+    """
+    cumulative = np.cumsum(counts, axis=-1)
+    paths = cumulative[..., -1:]
+
+    def order_statistic(k):
+        # The k-th smallest population is the number of populations with at most k paths below
+        return (cumulative <= k).sum(axis=-1)
+
+    bands = []
+    for quantile in quantiles:
+        position = (paths[..., 0] - 1) * quantile
+        lower = np.floor(position)
+        low = order_statistic(lower[..., np.newaxis])
+        high = order_statistic(
+            np.minimum(lower + 1, paths[..., 0] - 1)[..., np.newaxis]
+        )
+        bands.append(low + (high - low) * (position - lower))
+    return np.array(bands)
+
+
+def _count_paths(*args) -> np.ndarray:
+    return count_populations(simulate_paths(*args))
+
+
+class StochasticPredictor:
+    """
+    Simulates sample paths of the population, rather than the expected values forecast by
+    :class:`ModelPredictor`, so that forecasts can be given with uncertainty bands.
+
+    Paths are simulated in chunks of ``chunk_size``, and each chunk is given its own seed spawned
+    from ``seed``. Chunks can be spread over a process pool, and the results do not depend on the
+    number of processes used. For :meth:`predict` each chunk is reduced to counts of the paths with
+    each population before the next is simulated, so memory doesn't grow with the number of paths.
+    """
+
+    def __init__(
+        self,
+        population: pd.Series,
+        transition_rates: Optional[pd.Series] = None,
+        transition_numbers: Optional[pd.Series] = None,
+        start_date: date = date.today(),
+        config: Optional[Config] = None,
+        matrix: Optional[TransitionMatrix] = None,
+        seed: Optional[int] = None,
+    ):
+        if matrix is None:
+            matrix = TransitionMatrix.from_series(
+                population, transition_rates, transition_numbers, config
+            )
+        self.__matrix = matrix
+        self.__initial_population = population
+        self.__start_date = start_date
+        self.__seed = seed
+
+    @staticmethod
+    def from_model(
+        model: PopulationStats,
+        reference_start: date,
+        reference_end: date,
+        prediction_start: Optional[date] = None,
+        rate_adjustment: Optional[Iterable[pd.Series]] = None,
+        number_adjustment: Optional[Iterable[pd.Series]] = None,
+        seed: Optional[int] = None,
+    ) -> "StochasticPredictor":
+        predictor = ModelPredictor.from_model(
+            model,
+            reference_start,
+            reference_end,
+            prediction_start=prediction_start,
+            rate_adjustment=rate_adjustment,
+            number_adjustment=number_adjustment,
+        )
+        return StochasticPredictor(
+            population=predictor.initial_population,
+            transition_rates=predictor.transition_rates,
+            transition_numbers=predictor.transition_numbers,
+            start_date=predictor.date,
+            config=model.config,
+            seed=seed,
+        )
+
+    @property
+    def matrix(self) -> TransitionMatrix:
+        return self.__matrix
+
+    @property
+    def initial_population(self) -> pd.Series:
+        return self.__initial_population
+
+    @property
+    def date(self) -> date:
+        return self.__start_date
+
+    @property
+    def seed(self) -> Optional[int]:
+        return self.__seed
+
+    def dates(self, steps: int, step_days: int = 1) -> pd.Index:
+        return pd.Index(
+            [self.date + timedelta(days=(i + 1) * step_days) for i in range(steps)],
+            name="date",
+        )
+
+    def _chunks(self, steps: int, step_days: int, paths: int, chunk_size: int) -> list:
+        assert paths > 0, "Paths must be greater than 0"
+        assert chunk_size > 0, "Chunk size must be greater than 0"
+
+        sizes = [chunk_size] * (paths // chunk_size)
+        if paths % chunk_size:
+            sizes.append(paths % chunk_size)
+        seeds = np.random.SeedSequence(self.__seed).spawn(len(sizes))
+
+        population = self.__matrix.vector(self.initial_population)
+        return [
+            (
+                self.__matrix.rates,
+                self.__matrix.numbers,
+                population,
+                size,
+                steps,
+                step_days,
+                seed,
+            )
+            for size, seed in zip(sizes, seeds)
+        ]
+
+    @staticmethod
+    def _map(func, args: list, processes: int) -> Iterator:
+        # Results are yielded as they are ready, so they can be reduced without keeping them all
+        if processes == 1 or len(args) == 1:
+            yield from (func(*a) for a in args)
+            return
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            yield from executor.map(func, *zip(*args))
+
+    def simulate(
+        self,
+        steps: int = 1,
+        step_days: int = 1,
+        paths: int = 1000,
+        chunk_size: int = 250,
+        processes: int = 1,
+    ) -> np.ndarray:
+        """
+        Returns a (paths x steps x states) array of simulated populations, with the states in the
+        order of :attr:`matrix`. With ``processes`` greater than one the chunks are simulated in a
+        process pool, and None uses one process per CPU.
+
+        This holds every path in memory - see :meth:`count` for a summary that doesn't.
+        """
+        args = self._chunks(steps, step_days, paths, chunk_size)
+        return np.concatenate(list(self._map(simulate_paths, args, processes)))
+
+    def count(
+        self,
+        steps: int = 1,
+        step_days: int = 1,
+        paths: int = 1000,
+        chunk_size: int = 250,
+        processes: int = 1,
+    ) -> np.ndarray:
+        """
+        Returns a (steps x states x values) array of the number of simulated paths with each
+        population, see :func:`count_populations`. The paths are the same as :meth:`simulate` gives,
+        but each chunk is counted as soon as it is simulated.
+        """
+        args = self._chunks(steps, step_days, paths, chunk_size)
+        counts = None
+        for chunk in self._map(_count_paths, args, processes):
+            counts = add_counts(counts, chunk)
+        return counts
+
+    def predict(
+        self,
+        steps: int = 1,
+        step_days: int = 1,
+        paths: int = 1000,
+        quantiles: Sequence[float] = DEFAULT_QUANTILES,
+        chunk_size: int = 250,
+        processes: int = 1,
+    ) -> pd.DataFrame:
+        """
+        Returns the quantiles of the simulated populations, indexed by quantile and date
+        """
+        counts = self.count(steps, step_days, paths, chunk_size, processes)
+        bands = count_quantiles(counts, quantiles)
+
+        index = pd.MultiIndex.from_product(
+            [pd.Index(quantiles, name="quantile"), self.dates(steps, step_days)]
+        )
+        return pd.DataFrame(
+            bands.reshape(-1, len(self.__matrix.states)),
+            index=index,
+            columns=self.__matrix.states,
+        )
@@ -0,0 +1,619 @@
+from datetime import date, timedelta
+from typing import (
+    Any,
+    Hashable,
+    Iterable,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
+
+import numpy as np
+import pandas as pd
+
+from cs_demand_model.config import Config
+from cs_demand_model.population_stats import PopulationStats
+from cs_demand_model.prediction import ModelPredictor
+
+try:
+    import tqdm
+except ImportError:
+    tqdm = None
+
+
+def state_labels(config: Config) -> list:
+    """
+    Returns the (age_bin, placement_type) labels for all the states defined in the configuration
+    """
+    return [(s.age_bin.name, s.placement_type.name) for s in config.states()]
+
+
+def _labels(series: Optional[pd.Series]) -> set:
+    if series is None:
+        return set()
+    labels = set()
+    for from_state, to_state in series.index:
+        labels.add(from_state)
+        labels.add(to_state)
+    return labels
+
+
+def _collect_states(
+    config: Optional[Config], population: pd.Series, *transitions: pd.Series
+) -> list:
+    """
+    Lists every state in the config (if provided) followed by any other state mentioned in the
+    population or the transitions.
+    """
+    states = state_labels(config) if config else []
+    extra = set(population.index)
+    for series in transitions:
+        extra |= _labels(series)
+    extra = extra - set(states) - {tuple()}
+    return states + sorted(extra)
+
+
+def transition_step(
+    rates: np.ndarray, numbers: np.ndarray, population: np.ndarray, days: int = 1
+) -> np.ndarray:
+    """
+    Moves population vectors on by the given number of days. This performs the same calculation
+    as :func:`cs_demand_model.prediction.transition_population`.
+
+    ``rates`` and ``numbers`` are (..., states + 1, states + 1) arrays as described in
+    :class:`TransitionMatrix`, and ``population`` is (..., states). Any leading dimensions are
+    broadcast, so several populations and/or sets of rates can be moved on at once.
+    """
+    assert days > 0, "Days must be greater than 0"
+    if days > 1:
+        rates = 1 - (1 - rates) ** days
+        numbers = numbers * days
+
+    # Numbers are converted to rates based on the current population, where children outside
+    # of care are always given a population of 1
+    outside = np.ones(population.shape[:-1] + (1,))
+    denominator = np.concatenate([population, outside], axis=-1)[..., np.newaxis]
+    number_rates = np.divide(
+        numbers,
+        denominator,
+        out=np.zeros(np.broadcast_shapes(numbers.shape, denominator.shape)),
+        where=denominator != 0,
+    )
+    rates = rates + number_rates
+
+    # An infinite rate out of a state, e.g. from a same-day episode in a bin that was empty the
+    # day before, leaves the transfers undefined. As in calculate_transfers_out and
+    # calculate_transfers_in, the transfers out are capped at the population and anything
+    # undefined is treated as zero
+    out_rate = rates[..., :-1, :].sum(axis=-1)
+    with np.errstate(invalid="ignore"):
+        transfer_out = np.maximum(np.minimum(population * out_rate, population), 0)
+        fraction = np.divide(
+            rates[..., :-1, :],
+            out_rate[..., np.newaxis],
+            out=np.zeros(rates[..., :-1, :].shape),
+            where=out_rate[..., np.newaxis] != 0,
+        )
+    transfer_out = np.where(np.isnan(transfer_out), 0, transfer_out)
+    fraction = np.where(np.isfinite(fraction), fraction, 0)
+
+    transfer_in = np.einsum("...i,...ij->...j", transfer_out, fraction)
+    transfer_in = transfer_in + rates[..., -1, :]
+
+    return population - transfer_out + transfer_in[..., :-1]
+
+
+def daily_operator(rates: np.ndarray, numbers: np.ndarray) -> np.ndarray:
+    """
+    Builds the augmented affine operator for a single day from (..., states + 1, states + 1) rates
+    and numbers. Numbers must only be given for entrants - see :attr:`TransitionMatrix.is_affine`.
+    """
+    if numbers[..., :-1, :].any():
+        raise ValueError(
+            "Transition numbers between states in care cannot be expressed as an operator"
+        )
+    rates = rates + numbers
+    size = rates.shape[-1] - 1
+
+    # Where the rates out of a state add up to more than one, everyone leaves and the
+    # transfers are split proportionally, so we scale the rates down to match. Where the rate out
+    # is infinite everyone leaves, but as in transition_step the split is undefined so nobody
+    # arrives anywhere
+    out_rate = rates[..., :-1, :].sum(axis=-1)
+    leave = np.where(out_rate > 0, np.minimum(out_rate, 1), 0)
+    scale = np.divide(
+        leave,
+        out_rate,
+        out=np.zeros_like(out_rate),
+        where=out_rate > 0,
+    )
+    with np.errstate(invalid="ignore"):
+        flows = rates[..., :-1, :-1] * scale[..., np.newaxis]
+    flows = np.where(np.isfinite(flows), flows, 0)
+    stay = np.eye(size) * (1 - leave)[..., np.newaxis, :]
+
+    operator = np.zeros(rates.shape)
+    operator[..., :size, :size] = np.swapaxes(stay + flows, -1, -2)
+    operator[..., :size, size] = rates[..., -1, :-1]
+    operator[..., size, size] = 1
+    return operator
+
+
+def jump(operator: np.ndarray, population: np.ndarray) -> np.ndarray:
+    """
+    Applies an augmented affine operator to (..., states) population vectors
+    """
+    outside = np.ones(population.shape[:-1] + (1,))
+    augmented = np.concatenate([population, outside], axis=-1)
+    return np.einsum("...ij,...j->...i", operator, augmented)[..., :-1]
+
+
+class TransitionMatrix:
+    """
+    The transition rates and numbers used by the :class:`ModelPredictor`, compiled into dense arrays
+    over a fixed list of states.
+
+    Both ``rates`` and ``numbers`` are (states + 1) x (states + 1) arrays where the extra row and column
+    represent children outside of care, i.e. the ``tuple()`` label used for entrants and for leaving care.
+    """
+
+    def __init__(
+        self,
+        states: Sequence[Hashable],
+        transition_rates: Optional[pd.Series] = None,
+        transition_numbers: Optional[pd.Series] = None,
+    ):
+        self.__states = pd.Index(states, tupleize_cols=False)
+        if not self.__states.is_unique:
+            raise ValueError("States must be unique")
+
+        self.__rates = self.compile(transition_rates)
+        self.__numbers = self.compile(transition_numbers)
+        self.__operators = {}
+
+    @staticmethod
+    def from_series(
+        population: pd.Series,
+        transition_rates: Optional[pd.Series] = None,
+        transition_numbers: Optional[pd.Series] = None,
+        config: Optional[Config] = None,
+    ) -> "TransitionMatrix":
+        """
+        Builds a matrix covering every state in the config (if provided) as well as any state mentioned
+        in the population or the transitions.
+        """
+        states = _collect_states(
+            config, population, transition_rates, transition_numbers
+        )
+        return TransitionMatrix(states, transition_rates, transition_numbers)
+
+    @property
+    def states(self) -> pd.Index:
+        return self.__states
+
+    @property
+    def rates(self) -> np.ndarray:
+        return self.__rates
+
+    @property
+    def numbers(self) -> np.ndarray:
+        return self.__numbers
+
+    def _position(self, label) -> int:
+        if label == tuple():
+            return len(self.__states)
+        return self.__states.get_loc(label)
+
+    def compile(self, series: Optional[pd.Series]) -> np.ndarray:
+        """
+        Converts a series of transitions indexed by (from, to) into a dense array over the states
+        of this matrix. Repeated transitions are summed and missing values are treated as zero.
+        """
+        size = len(self.__states) + 1
+        matrix = np.zeros((size, size))
+        if series is None:
+            return matrix
+
+        series = series.fillna(0)
+        rows = [self._position(from_state) for from_state, _ in series.index]
+        cols = [self._position(to_state) for _, to_state in series.index]
+        np.add.at(matrix, (rows, cols), series.values)
+        return matrix
+
+    def vector(self, population: pd.Series) -> np.ndarray:
+        """
+        Converts a population series to a vector in the order of the states in this matrix
+        """
+        return (
+            population.reindex(self.__states, fill_value=0)
+            .fillna(0)
+            .values.astype(float)
+        )
+
+    def series(self, vector: np.ndarray, name=None) -> pd.Series:
+        return pd.Series(vector, index=self.__states, name=name)
+
+    def step(self, population: np.ndarray, days: int = 1) -> np.ndarray:
+        """
+        Moves the population vector on by the given number of days. This performs the same calculation
+        as :func:`cs_demand_model.prediction.transition_population`.
+        """
+        return transition_step(self.__rates, self.__numbers, population, days)
+
+    @property
+    def is_affine(self) -> bool:
+        """
+        True if a daily step is an affine map of the population. This is the case unless there are
+        transition numbers between states in care, as those are converted to rates using the current population.
+        """
+        return not self.__numbers[:-1].any()
+
+    def operator(self, days: int = 1) -> np.ndarray:
+        """
+        Returns the augmented affine operator that moves the column vector ``[population, 1]`` on by
+        the given number of days.
+
+        This is the one-day operator raised to the power of ``days`` by repeated squaring, so unlike
+        :meth:`step` the result does not depend on how a period is split into steps.
+        """
+        assert days > 0, "Days must be greater than 0"
+        if days in self.__operators:
+            return self.__operators[days]
+
+        if days == 1:
+            operator = daily_operator(self.__rates, self.__numbers)
+        else:
+            operator = np.linalg.matrix_power(self.operator(1), days)
+
+        self.__operators[days] = operator
+        return operator
+
+    def jump(self, population: np.ndarray, days: int) -> np.ndarray:
+        """
+        Moves the population vector on by the given number of days using :meth:`operator`
+        """
+        return jump(self.operator(days), population)
+
+
+class MatrixPredictor:
+    """
+    A drop-in alternative to :class:`ModelPredictor` that compiles the transitions into a
+    :class:`TransitionMatrix` once and then advances the population with NumPy arithmetic.
+
+    With ``exact_steps`` each step applies the one-day operator raised to the power of the step size
+    rather than approximating multi-day rates, so the forecast for a given date is the same
+    regardless of ``step_days``.
+    """
+
+    def __init__(
+        self,
+        population: pd.Series,
+        transition_rates: Optional[pd.Series] = None,
+        transition_numbers: Optional[pd.Series] = None,
+        start_date: date = date.today(),
+        config: Optional[Config] = None,
+        matrix: Optional[TransitionMatrix] = None,
+        exact_steps: bool = False,
+    ):
+        if matrix is None:
+            matrix = TransitionMatrix.from_series(
+                population, transition_rates, transition_numbers, config
+            )
+        self.__matrix = matrix
+        self.__initial_population = population
+        self.__start_date = start_date
+        self.__exact_steps = exact_steps
+
+    @staticmethod
+    def from_model(
+        model: PopulationStats,
+        reference_start: date,
+        reference_end: date,
+        prediction_start: Optional[date] = None,
+        rate_adjustment: Optional[Iterable[pd.Series]] = None,
+        number_adjustment: Optional[Iterable[pd.Series]] = None,
+        exact_steps: bool = False,
+    ) -> "MatrixPredictor":
+        predictor = ModelPredictor.from_model(
+            model,
+            reference_start,
+            reference_end,
+            prediction_start=prediction_start,
+            rate_adjustment=rate_adjustment,
+            number_adjustment=number_adjustment,
+        )
+        return MatrixPredictor(
+            population=predictor.initial_population,
+            transition_rates=predictor.transition_rates,
+            transition_numbers=predictor.transition_numbers,
+            start_date=predictor.date,
+            config=model.config,
+            exact_steps=exact_steps,
+        )
+
+    @property
+    def matrix(self) -> TransitionMatrix:
+        return self.__matrix
+
+    @property
+    def initial_population(self) -> pd.Series:
+        return self.__initial_population
+
+    @property
+    def date(self) -> date:
+        return self.__start_date
+
+    @property
+    def exact_steps(self) -> bool:
+        return self.__exact_steps
+
+    def _advance(self, population: np.ndarray, days: int) -> np.ndarray:
+        if self.__exact_steps:
+            return self.__matrix.jump(population, days)
+        return self.__matrix.step(population, days=days)
+
+    def next(self, step_days: int = 1) -> "MatrixPredictor":
+        population = self._advance(
+            self.__matrix.vector(self.initial_population), step_days
+        )
+        next_date = self.date + timedelta(days=step_days)
+        return MatrixPredictor(
+            self.__matrix.series(population, name=next_date),
+            start_date=next_date,
+            matrix=self.__matrix,
+            exact_steps=self.__exact_steps,
+        )
+
+    def population_at(self, prediction_date: date) -> pd.Series:
+        """
+        Predicts the population at the given date in a single jump, using O(log days) matrix products.
+        """
+        days = (prediction_date - self.date).days
+        population = self.__matrix.vector(self.initial_population)
+        if days > 0:
+            population = self.__matrix.jump(population, days)
+        return self.__matrix.series(population, name=prediction_date)
+
+    def predict(
+        self, steps: int = 1, step_days: int = 1, progress=False
+    ) -> pd.DataFrame:
+        matrix = self.__matrix
+
+        if progress and tqdm:
+            iterator = tqdm.trange(steps)
+            set_description = iterator.set_description
+        else:
+            iterator = range(steps)
+            set_description = lambda x: None
+
+        population = matrix.vector(self.initial_population)
+        predictions = np.empty((steps, len(matrix.states)))
+        dates = []
+        for i in iterator:
+            population = self._advance(population, step_days)
+            predictions[i] = population
+
+            dates.append(self.__start_date + timedelta(days=(i + 1) * step_days))
+            set_description(f"{dates[-1]:%Y-%m}")
+
+        return pd.DataFrame(predictions, index=dates, columns=matrix.states)
+
+
+class Scenario(NamedTuple):
+    """
+    A set of adjustments applied on top of the base transition rates and numbers
+    """
+
+    rate_adjustment: Union[None, pd.Series, Iterable[pd.Series]] = None
+    number_adjustment: Union[None, pd.Series, Iterable[pd.Series]] = None
+
+
+def _as_scenario(value: Any) -> Scenario:
+    """
+    Scenarios can be given as a :class:`Scenario`, None for no adjustments, or anything else is treated
+    as a rate adjustment. Objects with a ``transition_rates`` attribute, such as the RPC adjustments,
+    contribute those rates.
+    """
+    if isinstance(value, Scenario):
+        return value
+    if value is None or isinstance(value, pd.Series):
+        return Scenario(rate_adjustment=value)
+    if hasattr(value, "transition_rates"):
+        return Scenario(rate_adjustment=value.transition_rates)
+    return Scenario(rate_adjustment=value)
+
+
+def _as_list(adjustment: Union[None, pd.Series, Iterable[pd.Series]]) -> list:
+    if adjustment is None:
+        return []
+    if isinstance(adjustment, pd.Series):
+        return [adjustment]
+    return [a for a in adjustment if a is not None]
+
+
+class ScenarioPredictor:
+    """
+    Forecasts several scenarios side by side, where each scenario is a set of adjustments to the same
+    base transition rates and numbers.
+
+    The base rates, entrants and initial population are calculated once, and the populations for all
+    scenarios are advanced together as a (scenarios x states) array. Each row of the forecast is the
+    same as the :class:`MatrixPredictor` forecast for that scenario's adjustments.
+    """
+
+    def __init__(
+        self,
+        population: pd.Series,
+        transition_rates: Optional[pd.Series] = None,
+        transition_numbers: Optional[pd.Series] = None,
+        scenarios: Optional[Mapping[Hashable, Any]] = None,
+        start_date: date = date.today(),
+        config: Optional[Config] = None,
+        exact_steps: bool = False,
+    ):
+        if scenarios is None:
+            scenarios = {"base": None}
+        scenarios = {name: _as_scenario(value) for name, value in scenarios.items()}
+        if not scenarios:
+            raise ValueError("At least one scenario is required")
+
+        rate_adjustments = {
+            name: _as_list(s.rate_adjustment) for name, s in scenarios.items()
+        }
+        number_adjustments = {
+            name: _as_list(s.number_adjustment) for name, s in scenarios.items()
+        }
+
+        # All scenarios share one list of states so that they can be stacked
+        states = _collect_states(
+            config,
+            population,
+            transition_rates,
+            transition_numbers,
+            *[a for adjustments in rate_adjustments.values() for a in adjustments],
+            *[a for adjustments in number_adjustments.values() for a in adjustments],
+        )
+        base = TransitionMatrix(states, transition_rates, transition_numbers)
+
+        self.__matrix = base
+        self.__scenarios = pd.Index(
+            list(scenarios), name="scenario", tupleize_cols=False
+        )
+        self.__rates = np.stack(
+            [
+                base.rates + sum(base.compile(a) for a in rate_adjustments[name])
+                for name in scenarios
+            ]
+        )
+        self.__numbers = np.stack(
+            [
+                base.numbers + sum(base.compile(a) for a in number_adjustments[name])
+                for name in scenarios
+            ]
+        )
+        self.__initial_population = population
+        self.__start_date = start_date
+        self.__exact_steps = exact_steps
+        self.__operators = {}
+
+    @staticmethod
+    def from_model(
+        model: PopulationStats,
+        reference_start: date,
+        reference_end: date,
+        scenarios: Mapping[Hashable, Any],
+        prediction_start: Optional[date] = None,
+        exact_steps: bool = False,
+    ) -> "ScenarioPredictor":
+        predictor = ModelPredictor.from_model(
+            model,
+            reference_start,
+            reference_end,
+            prediction_start=prediction_start,
+        )
+        return ScenarioPredictor(
+            population=predictor.initial_population,
+            transition_rates=predictor.transition_rates,
+            transition_numbers=predictor.transition_numbers,
+            scenarios=scenarios,
+            start_date=predictor.date,
+            config=model.config,
+            exact_steps=exact_steps,
+        )
+
+    @property
+    def scenarios(self) -> pd.Index:
+        return self.__scenarios
+
+    @property
+    def states(self) -> pd.Index:
+        return self.__matrix.states
+
+    @property
+    def rates(self) -> np.ndarray:
+        """
+        The (scenarios x states + 1 x states + 1) transition rates for each scenario
+        """
+        return self.__rates
+
+    @property
+    def numbers(self) -> np.ndarray:
+        return self.__numbers
+
+    @property
+    def initial_population(self) -> pd.Series:
+        return self.__initial_population
+
+    @property
+    def date(self) -> date:
+        return self.__start_date
+
+    @property
+    def exact_steps(self) -> bool:
+        return self.__exact_steps
+
+    def operator(self, days: int = 1) -> np.ndarray:
+        """
+        Returns the stacked augmented operators for all scenarios - see :meth:`TransitionMatrix.operator`
+        """
+        assert days > 0, "Days must be greater than 0"
+        if days not in self.__operators:
+            if days == 1:
+                operator = daily_operator(self.__rates, self.__numbers)
+            else:
+                operator = np.linalg.matrix_power(self.operator(1), days)
+            self.__operators[days] = operator
+        return self.__operators[days]
+
+    def _advance(self, population: np.ndarray, days: int) -> np.ndarray:
+        if self.__exact_steps:
+            return jump(self.operator(days), population)
+        return transition_step(self.__rates, self.__numbers, population, days)
+
+    def population_at(self, prediction_date: date) -> pd.DataFrame:
+        """
+        Predicts the population for each scenario at the given date in a single jump
+        """
+        days = (prediction_date - self.date).days
+        population = self.__matrix.vector(self.initial_population)
+        population = np.broadcast_to(
+            population, (len(self.__scenarios), len(population))
+        )
+        if days > 0:
+            population = jump(self.operator(days), population)
+        return pd.DataFrame(population, index=self.__scenarios, columns=self.states)
+
+    def predict(
+        self, steps: int = 1, step_days: int = 1, progress=False
+    ) -> pd.DataFrame:
+        """
+        Returns the forecast for all scenarios, indexed by scenario and date
+        """
+        if progress and tqdm:
+            iterator = tqdm.trange(steps)
+            set_description = iterator.set_description
+        else:
+            iterator = range(steps)
+            set_description = lambda x: None
+
+        population = self.__matrix.vector(self.initial_population)
+        population = np.broadcast_to(
+            population, (len(self.__scenarios), len(population))
+        )
+        predictions = np.empty((len(self.__scenarios), steps, len(self.states)))
+        dates = []
+        for i in iterator:
+            population = self._advance(population, step_days)
+            predictions[:, i] = population
+
+            dates.append(self.__start_date + timedelta(days=(i + 1) * step_days))
+            set_description(f"{dates[-1]:%Y-%m}")
+
+        index = pd.MultiIndex.from_product(
+            [self.__scenarios, pd.Index(dates, name="date")]
+        )
+        return pd.DataFrame(
+            predictions.reshape(-1, len(self.states)), index=index, columns=self.states
+        )
@@ -0,0 +1,71 @@
+import gc
+import weakref
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from cs_demand_model._cache import BoundedCache, cached_method
+
+
+class Calculator:
+    def __init__(self, cache_size=2):
+        self.cache_size = cache_size
+        self.calls = []
+
+    @cached_method
+    def days(self, start, end):
+        self.calls.append((start, end))
+        return (pd.Timestamp(end) - pd.Timestamp(start)).days
+
+
+def test_lru_eviction():
+    cache = BoundedCache(maxsize=2)
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+    cache.get("a", lambda: None)
+    cache.get("c", lambda: 3)
+
+    assert cache.get("a", lambda: None) == 1
+    assert cache.get("b", lambda: None) is None
+    assert cache.info() == (2, 4, 2, 2)
+
+
+def test_fifo_eviction():
+    cache = BoundedCache(maxsize=2, eviction="fifo")
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+    cache.get("a", lambda: None)
+    cache.get("c", lambda: 3)
+
+    assert cache.get("a", lambda: None) is None
+
+
+def test_invalid_eviction():
+    with pytest.raises(ValueError):
+        BoundedCache(eviction="random")
+
+
+def test_dates_are_normalised():
+    calc = Calculator()
+    assert calc.days(date(2020, 1, 1), date(2020, 2, 1)) == 31
+    assert calc.days(datetime(2020, 1, 1), "2020-02-01") == 31
+    assert calc.days(pd.Timestamp(2020, 1, 1), date(2020, 2, 1)) == 31
+
+    assert len(calc.calls) == 1
+    assert calc.days.cache_info() == (2, 1, 2, 1)
+
+
+def test_cache_is_per_instance():
+    first, second = Calculator(), Calculator(cache_size=0)
+    first.days(date(2020, 1, 1), date(2020, 2, 1))
+    second.days(date(2020, 1, 1), date(2020, 2, 1))
+    second.days(date(2020, 1, 1), date(2020, 2, 1))
+
+    assert len(first.calls) == 1
+    assert len(second.calls) == 2
+
+    ref = weakref.ref(first)
+    del first
+    gc.collect()
+    assert ref() is None
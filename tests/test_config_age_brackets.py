@@ -1,10 +1,12 @@
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 import cs_demand_model.fixtures.config
 from cs_demand_model.config import Config
 from cs_demand_model.config._age_brackets import build_age_brackets
+from cs_demand_model.config._placement_categories import build_placement_categories
 
 fixtures_file = (
     Path(cs_demand_model.fixtures.config.__file__).parent / "standard-v1.yaml"
@@ -37,3 +39,37 @@ def test_placement_categories(config):
         PlacementCategories.FOSTERING,
         PlacementCategories.OTHER,
     )
+
+
+def test_bin_edges(AgeBrackets):
+    edges, brackets = AgeBrackets.bin_edges()
+    assert edges.tolist() == [-1, 1, 5, 10, 16, 30]
+    assert brackets == tuple(AgeBrackets)
+
+
+def test_bin_edges_with_gaps():
+    AgeBrackets = build_age_brackets(
+        dict(
+            A=dict(min=0, max=2),
+            B=dict(min=1, max=4),
+            C=dict(min=6, max=8),
+        ),
+        build_placement_categories({}),
+    )
+    edges, brackets = AgeBrackets.bin_edges()
+    assert edges.tolist() == [0, 1, 2, 4, 6, 8]
+    assert brackets == (
+        AgeBrackets.A,
+        AgeBrackets.A,
+        AgeBrackets.B,
+        None,
+        AgeBrackets.C,
+    )
+
+    for age in np.arange(-1, 9, 0.25):
+        ix = np.searchsorted(edges, age, side="right") - 1
+        expected = AgeBrackets.bracket_for_age(age)
+        if 0 <= ix < len(brackets):
+            assert brackets[ix] == expected
+        else:
+            assert expected is None
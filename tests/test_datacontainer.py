@@ -1,8 +1,44 @@
+import dataclasses
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+import pytest
+from fs.memoryfs import MemoryFS
+
 import cs_demand_model_samples
 from cs_demand_model import Config, DemandModellingDataContainer, fs_datastore
+from cs_demand_model.__main__ import CliSetup
 from cs_demand_model.data.ssda903 import SSDA903TableType
+from cs_demand_model.datacontainer import clean_episodes
+from cs_demand_model.datastore import DataStore, FileFormat
+from cs_demand_model.datastore._fs import FSDataStore
+
+FIXTURES = Path(__file__).parent / "fixtures" / "combined"
+
+
+class RecordingDataStore(DataStore):
+    def __init__(self, datastore: DataStore, file_format: FileFormat = None):
+        self.datastore = datastore
+        self.file_format = file_format
+        self.reads = []
+
+    @property
+    def files(self):
+        for file in self.datastore.files:
+            if self.file_format:
+                metadata = dataclasses.replace(file.metadata, format=self.file_format)
+                file = dataclasses.replace(file, metadata=metadata)
+            yield file
+
+    def open(self, file):
+        return self.datastore.open(file)
+
+    def to_dataframe(self, file, **kwargs):
+        self.reads.append((file.name, kwargs))
+        return super().to_dataframe(file, **kwargs)
 
 
 def test_data_container():
@@ -17,3 +53,202 @@ def test_data_container():
     assert container.last_year == 2022
 
     assert len(list(container.get_tables_by_type(SSDA903TableType.HEADER))) == 5
+
+
+def test_enriched_view_categories():
+    config = Config()
+    container = DemandModellingDataContainer(fs_datastore(FIXTURES.as_posix()), config)
+    enriched = container.enriched_view
+
+    categories = list(config.PlacementCategories)
+    for column in ["placement_type", "placement_type_before", "placement_type_after"]:
+        assert enriched[column].dtype == "category"
+        assert enriched[column].cat.categories.tolist() == categories
+
+    assert enriched["age_bin"].cat.categories.tolist() == list(config.AgeBrackets)
+
+    for place, placement_type in zip(enriched["PLACE"], enriched["placement_type"]):
+        assert placement_type == config.PlacementCategories.placement_type_map.get(
+            place, config.PlacementCategories.OTHER
+        )
+
+
+def test_detection_reads_headers_only():
+    datastore = RecordingDataStore(fs_datastore(FIXTURES.as_posix()))
+    container = DemandModellingDataContainer(datastore, Config())
+
+    assert {kwargs.get("nrows") for _, kwargs in datastore.reads} <= {0, None}
+    assert [kwargs for _, kwargs in datastore.reads if "nrows" not in kwargs] == [
+        {"usecols": ["DECOM"]}
+    ] * len(list(container.get_tables_by_type(SSDA903TableType.EPISODES)))
+    assert container.first_year == 2018
+    assert container.last_year == 2022
+
+
+def test_json_frames_are_read_once():
+    filesystem = MemoryFS()
+    for path in FIXTURES.glob("2021-*.csv"):
+        df = pd.read_csv(path)
+        filesystem.writetext(path.name, df.to_json(orient="records"))
+
+    datastore = RecordingDataStore(FSDataStore(filesystem), FileFormat.JSON)
+    container = DemandModellingDataContainer(datastore, Config())
+    assert container.last_year == 2022
+    assert len(datastore.reads) == 2
+
+    episodes = container.get_table(2022, SSDA903TableType.EPISODES)
+    assert len(datastore.reads) == 2
+    assert episodes.columns.tolist() == SSDA903TableType.EPISODES.value.schema.columns
+    assert episodes["DECOM"].dtype == "datetime64[ns]"
+
+    container.get_table(2022, SSDA903TableType.EPISODES)
+    assert len(datastore.reads) == 3
+
+
+def test_tables_are_read_with_schema():
+    container = DemandModellingDataContainer(
+        fs_datastore(FIXTURES.as_posix()), Config()
+    )
+    episodes = container.get_table(2022, SSDA903TableType.EPISODES)
+    header = next(container.get_tables_by_type(SSDA903TableType.HEADER))
+
+    assert episodes.columns.tolist() == [
+        "CHILD",
+        "DECOM",
+        "RNE",
+        "LS",
+        "PLACE",
+        "DEC",
+        "REC",
+    ]
+    assert header.columns.tolist() == ["CHILD", "SEX", "DOB", "ETHNIC"]
+    assert pd.api.types.is_string_dtype(episodes["CHILD"].dtype)
+    assert episodes["PLACE"].dtype == "category"
+    assert episodes["DEC"].dtype == "datetime64[ns]"
+    assert header["DOB"].dtype == "datetime64[ns]"
+
+    combined = container.combined_data
+    for column in ["PLACE", "LS", "RNE", "SEX"]:
+        assert combined[column].dtype == "category"
+
+
+def test_headers_are_read_once():
+    datastore = RecordingDataStore(fs_datastore(FIXTURES.as_posix()))
+    container = DemandModellingDataContainer(datastore, Config())
+    datastore.reads.clear()
+
+    combined = container.combined_data
+    names = [name for name, _ in datastore.reads]
+    assert len(names) == len(set(names)) == len(container.file_info)
+
+    by_year = pd.concat(
+        [
+            container.combined_year(year)
+            for year in range(container.first_year, container.last_year + 1)
+        ]
+    )
+    assert len(by_year) >= len(combined)
+
+
+@pytest.mark.parametrize("executor_class", [ThreadPoolExecutor, ProcessPoolExecutor])
+def test_parallel_reads_match_serial(executor_class):
+    datastore = fs_datastore(FIXTURES.as_posix())
+    serial = DemandModellingDataContainer(datastore, Config())
+
+    with executor_class(max_workers=2) as executor:
+        container = DemandModellingDataContainer(datastore, Config(), executor=executor)
+        assert container.file_info == serial.file_info
+        combined = container.combined_data
+
+    pd.testing.assert_frame_equal(combined, serial.combined_data)
+    pd.testing.assert_frame_equal(container.header, serial.header)
+
+
+def test_fs_datastore_pickle():
+    datastore = fs_datastore(FIXTURES.as_posix())
+    copy = pickle.loads(pickle.dumps(datastore))
+    assert list(copy.files) == list(datastore.files)
+
+
+def _clean_episodes_reference(combined: pd.DataFrame) -> pd.DataFrame:
+    combined = combined.sort_values(["CHILD", "DECOM", "DEC"], na_position="first")
+    combined = combined.drop_duplicates(["CHILD", "DECOM"], keep="last")
+    combined = combined.drop_duplicates(["CHILD", "DEC"], keep="first")
+    decom_next = combined.groupby("CHILD")["DECOM"].shift(-1)
+    change_ix = combined["DEC"].isna() | combined["DEC"].gt(decom_next)
+    combined.loc[change_ix, "DEC"] = decom_next[change_ix]
+    return combined
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_clean_episodes_matches_rules(seed):
+    rng = np.random.default_rng(seed)
+    size = 2000
+    decom = pd.Timestamp("2020-01-01") + pd.to_timedelta(
+        rng.integers(0, 60, size), unit="D"
+    )
+    dec = decom + pd.to_timedelta(rng.integers(0, 30, size), unit="D")
+    dec = dec.where(rng.random(size) > 0.2)
+    episodes = pd.DataFrame(
+        {
+            "CHILD": rng.integers(0, 100, size).astype(str),
+            "DECOM": decom,
+            "DEC": dec,
+            "PLACE": rng.integers(0, 5, size),
+        },
+        index=rng.permutation(size),
+    )
+
+    child, _ = pd.factorize(episodes["CHILD"], sort=True)
+    order, keep, dec = clean_episodes(
+        child, episodes["DECOM"].values, episodes["DEC"].values
+    )
+    cleaned = episodes.take(order[keep])
+    cleaned["DEC"] = dec[keep]
+
+    pd.testing.assert_frame_equal(cleaned, _clean_episodes_reference(episodes))
+
+
+def test_related_placement_types():
+    config = Config()
+    container = DemandModellingDataContainer(fs_datastore(FIXTURES.as_posix()), config)
+    enriched = container.enriched_view
+    not_in_care = config.PlacementCategories.NOT_IN_CARE
+
+    rows = list(enriched.itertuples())
+    for previous, current in zip(rows[:-1], rows[1:]):
+        continues = previous.CHILD == current.CHILD and previous.DEC == current.DECOM
+        assert current.placement_type_before == (
+            previous.placement_type if continues else not_in_care
+        )
+        assert previous.placement_type_after == (
+            current.placement_type if continues else not_in_care
+        )
+    assert rows[0].placement_type_before == not_in_care
+    assert rows[-1].placement_type_after == not_in_care
+
+
+def test_children_are_encoded():
+    container = DemandModellingDataContainer(
+        fs_datastore(FIXTURES.as_posix()), Config()
+    )
+    combined = container.combined_data
+    child_ids = container.child_ids
+
+    assert combined["CHILD"].dtype == "int32"
+    assert container.header["CHILD"].dtype == "int32"
+    assert child_ids.is_monotonic_increasing and child_ids.is_unique
+
+    episodes = pd.concat(container.get_tables_by_type(SSDA903TableType.EPISODES))
+    assert set(child_ids[combined["CHILD"]]) == set(episodes["CHILD"]) & set(child_ids)
+
+
+def test_cli_reads_after_pool_is_shut_down(tmp_path):
+    for _ in range(2):
+        setup = CliSetup(FIXTURES.as_posix(), cache_dir=tmp_path.as_posix(), workers=2)
+
+    # The second run loads the cached view, so the header is only read now
+    container = setup.dc
+    assert container.executor is None
+    assert len(container.child_ids) > 0
+    assert len(container.combined_year(container.last_year)) > 0
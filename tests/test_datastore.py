@@ -0,0 +1,96 @@
+import io
+from contextlib import contextmanager
+
+import pandas as pd
+import pytest
+from fs.memoryfs import MemoryFS
+
+from cs_demand_model.datastore import DataFile, FileFormat, Metadata
+from cs_demand_model.datastore._format import sniff_delimiter, sniff_format
+from cs_demand_model.datastore._fs import FSDataStore
+
+FRAME = pd.DataFrame(
+    {"CHILD": [1, 2], "SEX": [1, 2], "DOB": ["01/01/2010", "02/02/2012"]}
+)
+
+
+def _excel_bytes(df: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def datastore():
+    filesystem = MemoryFS()
+    filesystem.writebytes("comma.csv", FRAME.to_csv(index=False).encode())
+    filesystem.writebytes("semicolon.csv", FRAME.to_csv(index=False, sep=";").encode())
+    filesystem.writebytes("records.json", FRAME.to_json(orient="records").encode())
+    filesystem.writebytes("noextension", FRAME.to_json(orient="records").encode())
+    filesystem.writebytes("workbook.xlsx", _excel_bytes(FRAME))
+    filesystem.writebytes("misnamed.csv", _excel_bytes(FRAME))
+    filesystem.writebytes("empty.csv", b"")
+    return FSDataStore(filesystem)
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("comma.csv", FileFormat.CSV),
+        ("semicolon.csv", FileFormat.CSV),
+        ("records.json", FileFormat.JSON),
+        ("noextension", FileFormat.JSON),
+        ("workbook.xlsx", FileFormat.EXCEL),
+        ("misnamed.csv", FileFormat.EXCEL),
+    ],
+)
+def test_to_dataframe(datastore, name, expected):
+    assert datastore.detect_format(name) == expected
+    pd.testing.assert_frame_equal(datastore.to_dataframe(name), FRAME)
+
+
+def test_empty_file(datastore):
+    with pytest.raises(ValueError):
+        datastore.to_dataframe("empty.csv")
+
+
+def test_format_from_metadata_is_trusted(datastore):
+    file = DataFile(
+        name="records.json",
+        metadata=Metadata(name="records.json", size=0, format=FileFormat.CSV),
+    )
+    df = datastore.to_dataframe(file)
+    assert df.shape[0] == 0
+
+
+def test_non_seekable_stream():
+    class Unseekable(io.RawIOBase):
+        def __init__(self, data):
+            self.__data = io.BytesIO(data)
+
+        def readable(self):
+            return True
+
+        def readinto(self, buffer):
+            return self.__data.readinto(buffer)
+
+    class UnseekableDataStore(FSDataStore):
+        @contextmanager
+        def open(self, file):
+            with super().open(file) as f:
+                yield Unseekable(f.read())
+
+    filesystem = MemoryFS()
+    filesystem.writebytes("semicolon.csv", FRAME.to_csv(index=False, sep=";").encode())
+    filesystem.writebytes("workbook.xlsx", _excel_bytes(FRAME))
+    store = UnseekableDataStore(filesystem)
+
+    pd.testing.assert_frame_equal(store.to_dataframe("semicolon.csv"), FRAME)
+    pd.testing.assert_frame_equal(store.to_dataframe("workbook.xlsx"), FRAME)
+
+
+def test_sniffing():
+    assert sniff_format("data", b"\xef\xbb\xbf  [{}]") == FileFormat.JSON
+    assert sniff_format("data", b"CHILD,SEX") == FileFormat.CSV
+    assert sniff_delimiter(b"CHILD\tSEX\tDOB\n1\t2\t3\n4\t5") == "\t"
+    assert sniff_delimiter(b"CHILD") == ","
@@ -0,0 +1,117 @@
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fs.osfs import OSFS
+
+from cs_demand_model import Config, DemandModellingDataContainer, fs_datastore
+from cs_demand_model.data.ssda903 import SSDA903TableType
+from cs_demand_model.datastore import ArrowDataStore, FileFormat
+
+pyarrow = pytest.importorskip("pyarrow")
+import pyarrow.parquet  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures" / "combined"
+DATES = ["DECOM", "DEC", "DOB", "MC_DOB"]
+
+
+@pytest.fixture(scope="module")
+def arrow_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("arrow")
+    for csv in FIXTURES.glob("*.csv"):
+        df = pd.read_csv(csv)
+        for column in DATES:
+            if column in df.columns:
+                df[column] = pd.to_datetime(df[column], format="%d/%m/%Y")
+        table = pyarrow.Table.from_pandas(df, preserve_index=False)
+        if "episodes" in csv.name:
+            table = table.sort_by("DECOM")
+            pyarrow.parquet.write_table(
+                table, path / f"{csv.stem}.parquet", row_group_size=100
+            )
+        else:
+            pyarrow.feather.write_feather(table, path / f"{csv.stem}.feather")
+    return path
+
+
+@pytest.fixture
+def datastore(arrow_dir):
+    return ArrowDataStore(OSFS(arrow_dir.as_posix()))
+
+
+def test_files_and_formats(datastore):
+    names = sorted(f.name for f in datastore.files)
+    assert len(names) == 10
+    assert datastore.detect_format("2021-episodes.parquet") == FileFormat.PARQUET
+    assert datastore.detect_format("2021-header.feather") == FileFormat.ARROW
+
+
+def test_projection_and_filters(datastore):
+    header = datastore.to_dataframe("2021-episodes.parquet", nrows=0)
+    assert "HOME_POST" in header.columns and len(header) == 0
+
+    start = datetime(2021, 6, 1)
+    df = datastore.to_dataframe(
+        "2021-episodes.parquet",
+        columns=["CHILD", "DECOM", "DEC"],
+        filters=[("DECOM", ">=", start)],
+    )
+    assert df.columns.tolist() == ["CHILD", "DECOM", "DEC"]
+    assert len(df) > 0 and (df["DECOM"] >= start).all()
+
+    full = datastore.to_dataframe("2021-episodes.parquet")
+    assert len(df) == (full["DECOM"] >= start).sum()
+
+    header = datastore.to_dataframe(
+        "2021-header.feather", columns=["CHILD", "SEX"], filters=[("SEX", "==", 1)]
+    )
+    assert header.columns.tolist() == ["CHILD", "SEX"]
+    assert (header["SEX"] == 1).all()
+
+
+def test_projection_and_filters_on_csv(arrow_dir, tmp_path):
+    for path in arrow_dir.iterdir():
+        (tmp_path / path.name).write_bytes(path.read_bytes())
+    (tmp_path / "2021-header.csv").write_bytes(
+        (FIXTURES / "2021-header.csv").read_bytes()
+    )
+    datastore = ArrowDataStore(
+        OSFS(tmp_path.as_posix()), patterns=["*.feather", "*.csv"]
+    )
+
+    kwargs = dict(columns=["SEX", "CHILD"], filters=[("SEX", "==", 1)])
+    expected = datastore.to_dataframe("2021-header.feather", **kwargs)
+    actual = datastore.to_dataframe("2021-header.csv", **kwargs)
+    pd.testing.assert_frame_equal(actual, expected)
+
+    projected = datastore.to_dataframe("2021-header.csv", columns=["SEX", "CHILD"])
+    assert projected.columns.tolist() == ["SEX", "CHILD"]
+    assert len(projected) > len(actual)
+
+    df = datastore.to_dataframe("2021-header.csv", columns=["CHILD"], arrow_backed=True)
+    assert isinstance(df["CHILD"].dtype, pd.ArrowDtype)
+
+
+def test_arrow_backed(datastore):
+    df = datastore.to_dataframe("2021-header.feather", arrow_backed=True)
+    assert isinstance(df["CHILD"].dtype, pd.ArrowDtype)
+
+
+def test_enriched_view_matches_csv(arrow_dir):
+    datastore = fs_datastore(arrow_dir.as_posix())
+    assert isinstance(datastore, ArrowDataStore)
+
+    config = Config()
+    container = DemandModellingDataContainer(datastore, config)
+    expected = DemandModellingDataContainer(
+        fs_datastore(FIXTURES.as_posix()), config
+    ).enriched_view
+
+    assert container.last_year == 2022
+    episodes = container.get_table(2022, SSDA903TableType.EPISODES)
+    assert episodes["DECOM"].dtype == "datetime64[ns]"
+    pd.testing.assert_frame_equal(
+        container.enriched_view.reset_index(drop=True),
+        expected.reset_index(drop=True),
+    )
@@ -0,0 +1,136 @@
+import dataclasses
+import os
+import time
+from pathlib import Path
+
+from fs.memoryfs import MemoryFS
+from fs.osfs import OSFS
+
+from cs_demand_model import Config, DemandModellingDataContainer
+from cs_demand_model.data.ssda903 import SSDA903TableType
+from cs_demand_model.datastore import Manifest
+from cs_demand_model.datastore._fs import FSDataStore
+
+FIXTURES = Path(__file__).parent / "fixtures" / "combined"
+
+
+def _age(path: Path, seconds: int = 60):
+    stat = path.stat()
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+def test_manifest_lists_files():
+    filesystem = MemoryFS()
+    filesystem.writetext("a.csv", "a,b\n1,2\n")
+    filesystem.makedir("2021")
+    filesystem.writetext("2021/episodes.csv", "CHILD\n1\n")
+    filesystem.writetext("2021/notes.txt", "ignored")
+
+    files = {f.name: f.metadata for f in Manifest(filesystem).files}
+    assert set(files) == {"a.csv", "2021/episodes.csv"}
+    assert files["a.csv"].size == 8
+    assert files["2021/episodes.csv"].year == 2021
+    assert files["2021/episodes.csv"].name == "episodes.csv"
+    assert files["a.csv"].modified is not None
+
+
+def test_unchanged_directories_are_not_listed(tmp_path):
+    (tmp_path / "2021").mkdir()
+    (tmp_path / "2021" / "episodes.csv").write_text("CHILD\n1\n")
+    for path in [tmp_path / "2021", tmp_path]:
+        _age(path)
+
+    manifest = Manifest(OSFS(tmp_path.as_posix()))
+    assert len(manifest) == 1
+
+    listed = []
+    scandir = manifest.filesystem.scandir
+    manifest.filesystem.scandir = lambda path, **kwargs: listed.append(path) or scandir(
+        path, **kwargs
+    )
+    assert len(manifest) == 1
+    assert listed == []
+
+    (tmp_path / "header.csv").write_text("CHILD\n1\n")
+    assert {f.name for f in manifest.files} == {"2021/episodes.csv", "header.csv"}
+    assert listed == ["/"]
+
+    manifest.invalidate()
+    listed.clear()
+    assert len(manifest) == 2
+    assert listed == ["/", "/2021"]
+
+
+def test_files_rewritten_in_place_are_updated(tmp_path):
+    path = tmp_path / "2021" / "episodes.csv"
+    path.parent.mkdir()
+    path.write_text("CHILD\n")
+    _age(path)
+    for directory in [path.parent, tmp_path]:
+        _age(directory)
+
+    manifest = Manifest(OSFS(tmp_path.as_posix()))
+    file = manifest.files[0]
+    assert file.metadata.size == 6
+    metadata = dataclasses.replace(file.metadata, table=SSDA903TableType.EPISODES)
+    manifest.record(dataclasses.replace(file, metadata=metadata))
+    assert manifest.files[0].metadata.table == SSDA903TableType.EPISODES
+
+    directory_mtime = path.parent.stat().st_mtime
+    path.write_text("CHILD\n1\n2\n")
+    assert path.parent.stat().st_mtime == directory_mtime
+
+    file = manifest.files[0]
+    assert file.metadata.size == 10
+    assert file.metadata.table is None
+
+
+def test_files_are_not_restated_when_writes_invalidate(tmp_path):
+    (tmp_path / "a.csv").write_text("CHILD\n")
+    _age(tmp_path / "a.csv")
+    _age(tmp_path)
+
+    manifest = Manifest(OSFS(tmp_path.as_posix()), restat_files=False)
+    assert manifest.files[0].metadata.size == 6
+
+    paths = []
+    getinfo = manifest.filesystem.getinfo
+    manifest.filesystem.getinfo = lambda path, **kwargs: paths.append(path) or getinfo(
+        path, **kwargs
+    )
+    (tmp_path / "a.csv").write_text("CHILD\n1\n2\n")
+    assert manifest.files[0].metadata.size == 6
+    assert paths == ["/"]
+
+    manifest.invalidate()
+    assert manifest.files[0].metadata.size == 10
+
+
+def test_recorded_metadata_is_kept_until_file_changes():
+    filesystem = MemoryFS()
+    filesystem.writetext("a.csv", "a,b\n1,2\n")
+    manifest = Manifest(filesystem)
+
+    file = manifest.files[0]
+    metadata = dataclasses.replace(file.metadata, table=SSDA903TableType.HEADER)
+    manifest.record(dataclasses.replace(file, metadata=metadata))
+    assert manifest.files[0].metadata.table == SSDA903TableType.HEADER
+
+    time.sleep(0.01)
+    filesystem.writetext("a.csv", "a,b\n1,2\n3,4\n")
+    assert manifest.files[0].metadata.table is None
+
+
+def test_container_detects_unchanged_files_once():
+    datastore = FSDataStore(OSFS(FIXTURES.as_posix()))
+    first = DemandModellingDataContainer(datastore, Config())
+
+    reads = []
+    to_dataframe = datastore.to_dataframe
+    datastore.to_dataframe = lambda file, **kwargs: reads.append(file) or to_dataframe(
+        file, **kwargs
+    )
+    second = DemandModellingDataContainer(datastore, Config())
+
+    assert reads == []
+    assert second.file_info == first.file_info
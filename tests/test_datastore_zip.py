@@ -0,0 +1,150 @@
+import io
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from zipfile import ZipFile
+
+import pytest
+from fs.memoryfs import MemoryFS
+
+import cs_demand_model_samples
+from cs_demand_model import Config, DemandModellingDataContainer
+from cs_demand_model.datastore._opener import TmpZipDataStore, create_zip_store
+from cs_demand_model.datastore._zip import FSZipDataStore, ZipDataStore
+
+SAMPLE_ZIP = Path(cs_demand_model_samples.__file__).parent / "v1.zip"
+
+
+@pytest.fixture
+def datastore():
+    with ZipDataStore(SAMPLE_ZIP) as datastore:
+        yield datastore
+
+
+def test_files(datastore):
+    files = list(datastore.files)
+    with ZipFile(SAMPLE_ZIP) as archive:
+        expected = [i.filename for i in archive.infolist() if not i.is_dir()]
+    assert [f.name for f in files] == expected
+    assert {f.metadata.year for f in files} == {2017, 2018, 2019, 2020, 2021}
+
+
+def test_archive_is_opened_once(datastore):
+    archive = datastore._archive()
+    for file in datastore.files:
+        datastore.to_dataframe(file)
+    assert datastore._archive() is archive
+
+
+def test_concurrent_reads(datastore):
+    names = list(datastore.members) * 4
+
+    def read(name):
+        with datastore.open(name) as f:
+            return name, f.read()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(read, names))
+
+    with ZipFile(SAMPLE_ZIP) as archive:
+        for name, content in results:
+            assert content == archive.read(name)
+
+
+def test_close_and_pickle():
+    with ZipDataStore(SAMPLE_ZIP) as datastore:
+        archive = datastore._archive()
+        copy = pickle.loads(pickle.dumps(datastore))
+    assert archive.fp is None
+
+    with copy:
+        assert len(list(copy.files)) == len(list(datastore.files))
+
+
+def test_missing_member(datastore):
+    with pytest.raises(FileNotFoundError):
+        with datastore.open("2017/nothing.csv"):
+            pass
+
+
+class CountingFile(io.RawIOBase):
+    def __init__(self, f, counter, seekable=True):
+        self.__f = f
+        self.__counter = counter
+        self.__seekable = seekable
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return self.__seekable
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self.__f.seek(offset, whence)
+
+    def tell(self):
+        return self.__f.tell()
+
+    def readinto(self, buffer):
+        count = self.__f.readinto(buffer)
+        self.__counter["bytes"] += count
+        return count
+
+    def close(self):
+        self.__f.close()
+        super().close()
+
+
+class CountingFS(MemoryFS):
+    """
+    A filesystem without system paths that counts the bytes read through it
+    """
+
+    def __init__(self, seekable=True):
+        super().__init__()
+        self.counter = {"bytes": 0}
+        self.seekable = seekable
+
+    def openbin(self, path, mode="r", buffering=-1, **options):
+        f = super().openbin(path, mode, buffering, **options)
+        if "r" in mode and "+" not in mode:
+            return CountingFile(f, self.counter, self.seekable)
+        return f
+
+
+def test_range_reads_over_fs():
+    filesystem = CountingFS()
+    filesystem.writebytes("v1.zip", SAMPLE_ZIP.read_bytes())
+    filesystem.counter["bytes"] = 0
+
+    with create_zip_store(filesystem, "v1.zip") as datastore:
+        assert isinstance(datastore, FSZipDataStore)
+        assert len(list(datastore.files)) == 40
+        with datastore.open("2019/episodes.csv") as f:
+            f.read()
+
+        member = datastore.members["2019/episodes.csv"]
+        read = filesystem.counter["bytes"]
+        assert read < member.compress_size + 64 * 1024
+        assert read < SAMPLE_ZIP.stat().st_size / 4
+
+
+def test_container_over_fs_zip():
+    filesystem = CountingFS()
+    filesystem.writebytes("v1.zip", SAMPLE_ZIP.read_bytes())
+
+    with create_zip_store(filesystem, "v1.zip") as datastore:
+        container = DemandModellingDataContainer(datastore, Config())
+        with ZipDataStore(SAMPLE_ZIP) as local:
+            expected = DemandModellingDataContainer(local, Config()).combined_data
+        assert container.combined_data.shape == expected.shape
+
+
+def test_unseekable_fs_falls_back_to_copy():
+    filesystem = CountingFS(seekable=False)
+    filesystem.writebytes("v1.zip", SAMPLE_ZIP.read_bytes())
+
+    datastore = create_zip_store(filesystem, "v1.zip")
+    assert isinstance(datastore, TmpZipDataStore)
+    assert len(list(datastore.files)) == 40
+    datastore.close()
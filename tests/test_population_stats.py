@@ -0,0 +1,208 @@
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cs_demand_model import (
+    Config,
+    DemandModellingDataContainer,
+    ModelPredictor,
+    PopulationStats,
+    fs_datastore,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "combined"
+
+
+@pytest.fixture(scope="module")
+def config():
+    return Config()
+
+
+@pytest.fixture(scope="module")
+def enriched_view(config):
+    container = DemandModellingDataContainer(fs_datastore(FIXTURES.as_posix()), config)
+    return container.enriched_view
+
+
+@pytest.fixture
+def stats(enriched_view, config):
+    return PopulationStats(enriched_view, config)
+
+
+def _bin(row, placement_column="placement_type"):
+    return row.age_bin.name, getattr(row, placement_column).name
+
+
+def test_stock(stats, enriched_view):
+    for day in ["2019-03-31", "2020-07-15", "2021-12-31"]:
+        day = pd.Timestamp(day)
+        in_care = enriched_view[
+            (enriched_view.DECOM <= day)
+            & (enriched_view.DEC.isna() | (enriched_view.DEC > day))
+        ]
+        expected = {}
+        for row in in_care.itertuples():
+            expected[_bin(row)] = expected.get(_bin(row), 0) + 1
+
+        stock = stats.stock.loc[day]
+        assert stock[stock > 0].to_dict() == expected
+
+
+def test_stock_index(stats, enriched_view):
+    stock = stats.stock
+    assert stock.index.freq == "D"
+    assert stock.index[0] == enriched_view.DECOM.min()
+    assert stock.index[-1] == max(enriched_view.DECOM.max(), enriched_view.DEC.max())
+    assert stock.columns.is_monotonic_increasing
+    assert stock.columns.name == "bin"
+
+    # Only the episodes that are still open are in care on the last day
+    bins = pd.Index(
+        [_bin(row) for row in enriched_view.itertuples()], tupleize_cols=False
+    )
+    open_episodes = enriched_view.DEC.isna().groupby(bins).sum()
+    pd.testing.assert_series_equal(
+        stock.iloc[-1],
+        open_episodes.reindex(stock.columns, fill_value=0).astype(float),
+        check_names=False,
+    )
+
+
+def test_transitions(stats, enriched_view):
+    expected = {}
+    for row in enriched_view[enriched_view.DEC.notna()].itertuples():
+        key = (_bin(row), _bin(row, "placement_type_after"))
+        expected[key] = expected.get(key, 0) + 1
+
+    totals = stats.transitions.sum()
+    assert totals[totals > 0].to_dict() == expected
+
+
+def test_daily_transitions(stats):
+    daily = stats.daily_transitions
+    transitions = stats.transitions
+
+    assert len(daily.count) == (transitions.values != 0).sum()
+    assert (daily.count > 0).all()
+    assert np.all(np.diff(daily.pair * len(daily.index) + daily.day) > 0)
+    pd.testing.assert_frame_equal(daily.to_frame(), transitions)
+
+
+def test_daily_entrants(stats, enriched_view):
+    start, end = date(2020, 1, 1), date(2020, 12, 31)
+    entrants = stats.daily_entrants(start, end)
+
+    period = enriched_view[
+        (enriched_view.DECOM >= pd.Timestamp(start))
+        & (enriched_view.DECOM <= pd.Timestamp(end))
+        & (
+            enriched_view.placement_type_before
+            == stats.config.PlacementCategories.NOT_IN_CARE
+        )
+    ]
+    assert entrants.sum() * (end - start).days == pytest.approx(len(period))
+    assert set(entrants.index.get_level_values("from")) == {tuple()}
+
+
+def test_stock_is_cached(stats):
+    stock = stats.stock
+    transitions = stats.transitions
+    assert stats.stock is stock
+    assert stats.transitions is transitions
+
+    stats.raw_transition_rates(date(2020, 1, 1), date(2020, 12, 31))
+    assert stats.stock.columns.name == "bin"
+
+    stats.invalidate()
+    assert stats.stock is not stock
+    assert stats.transitions is not transitions
+    pd.testing.assert_frame_equal(stats.stock, stock)
+
+
+def test_stock_at(stats):
+    stock = stats.stock_at(date(2020, 7, 15))
+    assert stock.name == pd.Timestamp(2020, 7, 15)
+    pd.testing.assert_series_equal(
+        stock, stats.stock.loc["2020-07-15"], check_names=False
+    )
+
+
+def test_stock_at_does_not_share_stock(stats):
+    stock = stats.stock.copy()
+
+    stats.stock_at(date(2020, 7, 15))[:] = 0
+    ModelPredictor.from_model(stats, date(2020, 1, 1), date(2020, 12, 31)).predict(
+        2, step_days=30
+    )
+    ModelPredictor.from_model(stats, date(2020, 1, 1), date(2020, 7, 15))
+
+    pd.testing.assert_frame_equal(stats.stock, stock)
+    assert stats.stock_at(date(2020, 12, 31)).index.names == stock.columns.names
+
+
+def test_rows_without_bins_are_left_out(enriched_view, config):
+    unbinned = enriched_view.index[
+        enriched_view.DEC.notna()
+        & (
+            enriched_view.placement_type_before
+            == config.PlacementCategories.NOT_IN_CARE
+        )
+        & (enriched_view.DECOM >= "2020-01-01")
+    ][:3]
+    df = enriched_view.copy()
+    df.loc[unbinned[:2], "age_bin"] = np.nan
+    df.loc[unbinned[2:], "placement_type"] = np.nan
+
+    stats = PopulationStats(df, config)
+    expected = PopulationStats(df.drop(unbinned), config)
+
+    pd.testing.assert_frame_equal(stats.stock, expected.stock)
+    pd.testing.assert_frame_equal(stats.transitions, expected.transitions)
+    pd.testing.assert_series_equal(
+        stats.daily_entrants(date(2020, 1, 1), date(2021, 12, 31)),
+        expected.daily_entrants(date(2020, 1, 1), date(2021, 12, 31)),
+    )
+
+
+def test_cache_info(enriched_view, config):
+    stats = PopulationStats(enriched_view, config, cache_size=1)
+    stats.daily_entrants(date(2020, 1, 1), date(2020, 12, 31))
+    stats.daily_entrants(pd.Timestamp(2020, 1, 1), "2020-12-31")
+    stats.daily_entrants(date(2019, 1, 1), date(2019, 12, 31))
+
+    assert stats.cache_info()["daily_entrants"] == (1, 2, 1, 1)
+
+
+def _mean_rates(stats, start_date, end_date):
+    stock = stats.stock.truncate(before=start_date, after=end_date)
+    stock = stock.rename_axis(columns="start_bin")
+    transitions = stats.transitions.truncate(before=start_date, after=end_date)
+    stock, transitions = stock.align(transitions)
+    rates = transitions / stock.shift(1).fillna(method="bfill")
+    return rates.fillna(0).mean(axis=0)
+
+
+def test_raw_transition_rates_for_windows(stats):
+    windows = [
+        (date(2018, 4, 1), date(2019, 3, 31)),
+        (date(2020, 1, 1), date(2020, 1, 1)),
+        (date(2020, 1, 1), date(2020, 1, 2)),
+        (date(2021, 6, 1), date(2022, 6, 1)),
+        (date(2010, 1, 1), date(2030, 1, 1)),
+    ]
+    rates = stats.raw_transition_rates_for_windows(windows)
+    assert rates.shape == (len(windows), stats.transitions.shape[1])
+
+    for ix, (start_date, end_date) in enumerate(windows):
+        expected = _mean_rates(stats, start_date, end_date)
+        actual = rates.iloc[ix].reindex(expected.index)
+        assert actual.values.tolist() == [
+            pytest.approx(v, abs=1e-12) for v in expected.values
+        ]
+
+    single = stats.raw_transition_rates(*windows[0])
+    assert single.name == "transition_rate"
+    assert single.index.names == ["start_bin", "end_bin"]
@@ -0,0 +1,129 @@
+import itertools
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cs_demand_model.stochastic import (
+    DEFAULT_QUANTILES,
+    StochasticPredictor,
+    count_quantiles,
+)
+from cs_demand_model.transition_matrix import MatrixPredictor
+
+
+def transitions(values: dict) -> pd.Series:
+    series = pd.Series(values)
+    series.index.names = ["from", "to"]
+    return series
+
+
+@pytest.fixture
+def predictor_kwargs():
+    age_bins = ["Age Bin 1", "Age Bin 2"]
+    placement_types = ["PT1", "PT2", "PT3"]
+    index_values = list(itertools.product(age_bins, placement_types))
+    return dict(
+        population=pd.Series([100, 200, 0, 400, 500, 600], index=index_values),
+        transition_rates=transitions(
+            {
+                (("Age Bin 1", "PT1"), ("Age Bin 1", "PT2")): 0.01,
+                (("Age Bin 1", "PT2"), ("Age Bin 1", "PT1")): 0.005,
+                (("Age Bin 2", "PT1"), ("Age Bin 2", "PT3")): 0.02,
+                (("Age Bin 2", "PT2"), ()): 0.002,
+            }
+        ),
+        transition_numbers=transitions({((), ("Age Bin 1", "PT3")): 1.5}),
+        start_date=date(2020, 1, 1),
+    )
+
+
+def test_seed_is_reproducible(predictor_kwargs):
+    first = StochasticPredictor(**predictor_kwargs, seed=42)
+    second = StochasticPredictor(**predictor_kwargs, seed=42)
+    other = StochasticPredictor(**predictor_kwargs, seed=43)
+
+    samples = first.simulate(5, step_days=7, paths=50, chunk_size=20)
+    assert samples.shape == (50, 5, 6)
+    np.testing.assert_array_equal(
+        samples, second.simulate(5, step_days=7, paths=50, chunk_size=20)
+    )
+    assert not np.array_equal(
+        samples, other.simulate(5, step_days=7, paths=50, chunk_size=20)
+    )
+
+
+def test_process_pool_matches_single_process(predictor_kwargs):
+    predictor = StochasticPredictor(**predictor_kwargs, seed=1)
+    single = predictor.simulate(3, paths=40, chunk_size=10)
+    pooled = predictor.simulate(3, paths=40, chunk_size=10, processes=2)
+    np.testing.assert_array_equal(single, pooled)
+
+
+def test_mean_matches_expected_value(predictor_kwargs):
+    expected = MatrixPredictor(**predictor_kwargs).predict(6, step_days=10)
+    samples = StochasticPredictor(**predictor_kwargs, seed=7).simulate(
+        6, step_days=10, paths=2000
+    )
+    mean = pd.DataFrame(samples.mean(axis=0), columns=expected.columns)
+
+    assert (mean - expected.values).abs().max().max() < 1
+    assert (samples.sum(axis=2) >= 0).all()
+
+
+def test_quantile_bands(predictor_kwargs):
+    predictor = StochasticPredictor(**predictor_kwargs, seed=3)
+    bands = predictor.predict(4, step_days=30, paths=200, quantiles=[0.1, 0.5, 0.9])
+
+    assert bands.index.names == ["quantile", "date"]
+    assert bands.loc[0.5].index.tolist() == predictor.dates(4, 30).tolist()
+    assert (bands.loc[0.1] <= bands.loc[0.5]).all().all()
+    assert (bands.loc[0.5] <= bands.loc[0.9]).all().all()
+    assert (bands.loc[0.9] > bands.loc[0.1]).any().any()
+
+
+def test_quantiles_from_counts_match_samples(predictor_kwargs):
+    predictor = StochasticPredictor(**predictor_kwargs, seed=5)
+    quantiles = [0, 0.05, 0.33, 0.5, 0.9, 1]
+    samples = predictor.simulate(4, step_days=30, paths=101, chunk_size=25)
+    counts = predictor.count(4, step_days=30, paths=101, chunk_size=25)
+
+    assert counts.shape[:2] == (4, 6)
+    assert (counts.sum(axis=-1) == 101).all()
+    np.testing.assert_allclose(
+        count_quantiles(counts, quantiles), np.quantile(samples, quantiles, axis=0)
+    )
+
+    bands = predictor.predict(
+        4, step_days=30, paths=101, quantiles=quantiles, chunk_size=25, processes=2
+    )
+    np.testing.assert_allclose(
+        bands.values,
+        np.quantile(samples, quantiles, axis=0).reshape(-1, 6),
+    )
+
+
+def test_predict_does_not_keep_every_path(predictor_kwargs, monkeypatch):
+    predictor = StochasticPredictor(**predictor_kwargs, seed=5)
+    monkeypatch.setattr(
+        StochasticPredictor, "simulate", lambda *args, **kwargs: pytest.fail()
+    )
+    bands = predictor.predict(2, step_days=30, paths=100, chunk_size=10)
+    assert bands.shape == (len(DEFAULT_QUANTILES) * 2, 6)
+
+
+def test_sampling_with_infinite_rates(predictor_kwargs):
+    predictor_kwargs["transition_rates"] = transitions(
+        {
+            (("Age Bin 1", "PT1"), ("Age Bin 1", "PT2")): 0.01,
+            (("Age Bin 1", "PT3"), ("Age Bin 1", "PT1")): float("inf"),
+            (("Age Bin 2", "PT2"), ()): float("inf"),
+        }
+    )
+    expected = MatrixPredictor(**predictor_kwargs).predict(6)
+    samples = StochasticPredictor(**predictor_kwargs, seed=7).simulate(6, paths=500)
+    mean = pd.DataFrame(samples.mean(axis=0), columns=expected.columns)
+
+    assert (samples[..., 4] == 0).all()
+    assert (mean - expected.values).abs().max().max() < 1
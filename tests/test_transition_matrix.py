@@ -0,0 +1,362 @@
+import itertools
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from cs_demand_model import (
+    Config,
+    DemandModellingDataContainer,
+    ModelPredictor,
+    PopulationStats,
+    fs_datastore,
+)
+from cs_demand_model.prediction import combine_rates, transition_population
+from cs_demand_model.transition_matrix import (
+    MatrixPredictor,
+    Scenario,
+    ScenarioPredictor,
+    TransitionMatrix,
+    state_labels,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "combined"
+
+
+def transitions(values: dict) -> pd.Series:
+    series = pd.Series(values)
+    series.index.names = ["from", "to"]
+    return series
+
+
+def assert_same_population(expected: pd.Series, actual: pd.Series):
+    actual = actual.reindex(expected.index)
+    assert actual.values.tolist() == [
+        pytest.approx(v, abs=1e-9) for v in expected.values
+    ]
+
+
+@pytest.fixture
+def initial_population():
+    age_bins = ["Age Bin 1", "Age Bin 2"]
+    placement_types = ["PT1", "PT2", "PT3"]
+    index_values = list(itertools.product(age_bins, placement_types))
+    return pd.Series([100, 200, 0, 400, 500, 600], index=index_values)
+
+
+@pytest.mark.parametrize("days", [1, 7])
+def test_step_matches_transition_population(initial_population, days):
+    transition_rates = transitions(
+        {
+            (("Age Bin 1", "PT1"), ("Age Bin 1", "PT2")): 0.3,
+            (("Age Bin 1", "PT2"), ("Age Bin 1", "PT1")): 0.1,
+            (("Age Bin 1", "PT2"), ("Age Bin 1", "PT3")): 0.1,
+            (("Age Bin 1", "PT3"), ("Age Bin 1", "PT1")): 0.05,
+            (("Age Bin 2", "PT1"), ("Age Bin 2", "PT2")): 0.6,
+            (("Age Bin 2", "PT1"), ("Age Bin 2", "PT3")): 0.7,
+            (("Age Bin 2", "PT3"), ()): 0.01,
+        }
+    )
+    transition_numbers = transitions(
+        {
+            ((), ("Age Bin 1", "PT1")): 0.5,
+            ((), ("Age Bin 2", "PT2")): 0.25,
+            (("Age Bin 1", "PT1"), ("Age Bin 1", "PT3")): 2,
+            (("Age Bin 1", "PT3"), ("Age Bin 1", "PT2")): 1,
+        }
+    )
+
+    expected = transition_population(
+        initial_population, transition_rates, transition_numbers, days=days
+    )
+
+    matrix = TransitionMatrix.from_series(
+        initial_population, transition_rates, transition_numbers
+    )
+    actual = matrix.series(matrix.step(matrix.vector(initial_population), days=days))
+
+    assert_same_population(expected, actual)
+
+
+@pytest.mark.parametrize("days", [1, 2, 7])
+def test_step_with_infinite_rates(initial_population, days):
+    transition_rates = transitions(
+        {
+            (("Age Bin 1", "PT1"), ("Age Bin 1", "PT2")): 0.1,
+            (("Age Bin 1", "PT2"), ("Age Bin 1", "PT1")): float("inf"),
+            (("Age Bin 1", "PT3"), ("Age Bin 1", "PT1")): float("inf"),
+            (("Age Bin 2", "PT2"), ()): 0.02,
+        }
+    )
+    transition_numbers = transitions({((), ("Age Bin 1", "PT3")): 1.5})
+
+    expected = transition_population(
+        initial_population, transition_rates, transition_numbers, days=days
+    )
+
+    matrix = TransitionMatrix.from_series(
+        initial_population, transition_rates, transition_numbers
+    )
+    actual = matrix.series(matrix.step(matrix.vector(initial_population), days=days))
+
+    assert not actual.isna().any()
+    assert_same_population(expected, actual)
+
+
+def test_states_follow_config():
+    config = Config()
+    population = pd.Series({("ONE_TO_FIVE", "FOSTERING"): 10})
+    matrix = TransitionMatrix.from_series(population, config=config)
+
+    assert matrix.states.tolist() == state_labels(config)
+
+
+def test_predictor_matches_model_predictor(initial_population):
+    transition_rates = transitions(
+        {
+            (("Age Bin 1", "PT1"), ("Age Bin 1", "PT2")): 0.1,
+            (("Age Bin 1", "PT2"), ("Age Bin 1", "PT1")): 0.05,
+            (("Age Bin 2", "PT2"), ()): 0.02,
+        }
+    )
+    transition_numbers = transitions({((), ("Age Bin 1", "PT3")): 1.5})
+
+    kwargs = dict(
+        population=initial_population,
+        transition_rates=transition_rates,
+        transition_numbers=transition_numbers,
+        start_date=date(2020, 1, 1),
+    )
+    expected = ModelPredictor(**kwargs).predict(25, step_days=3)
+    actual = MatrixPredictor(**kwargs).predict(25, step_days=3)
+
+    assert actual.index.tolist() == expected.index.tolist()
+    for ix in range(len(expected)):
+        assert_same_population(expected.iloc[ix], actual.iloc[ix])
+
+    next_predictor = MatrixPredictor(**kwargs).next(3)
+    assert next_predictor.date == date(2020, 1, 4)
+    assert_same_population(expected.iloc[0], next_predictor.initial_population)
+
+
+def test_from_model_matches_model_predictor():
+    config = Config()
+    container = DemandModellingDataContainer(fs_datastore(FIXTURES.as_posix()), config)
+    stats = PopulationStats(container.enriched_view, config)
+
+    start, end = date(2021, 1, 1), date(2021, 12, 31)
+    expected = ModelPredictor.from_model(stats, start, end).predict(20, step_days=5)
+    actual = MatrixPredictor.from_model(stats, start, end).predict(20, step_days=5)
+
+    for ix in range(len(expected)):
+        assert_same_population(expected.iloc[ix], actual.iloc[ix])
+
+
+def test_operator_matches_daily_steps(initial_population):
+    transition_rates = transitions(
+        {
+            (("Age Bin 1", "PT1"), ("Age Bin 1", "PT2")): 0.1,
+            (("Age Bin 1", "PT2"), ("Age Bin 1", "PT1")): 0.05,
+            (("Age Bin 2", "PT1"), ("Age Bin 2", "PT2")): 0.6,
+            (("Age Bin 2", "PT1"), ("Age Bin 2", "PT3")): 0.7,
+            (("Age Bin 2", "PT2"), ()): 0.02,
+        }
+    )
+    transition_numbers = transitions({((), ("Age Bin 1", "PT3")): 1.5})
+    matrix = TransitionMatrix.from_series(
+        initial_population, transition_rates, transition_numbers
+    )
+    assert matrix.is_affine
+
+    population = matrix.vector(initial_population)
+    stepped = population
+    for _ in range(30):
+        stepped = matrix.step(stepped)
+
+    assert matrix.jump(population, 30).tolist() == [
+        pytest.approx(v, abs=1e-9) for v in stepped
+    ]
+
+
+def test_operator_with_infinite_rates(initial_population):
+    transition_rates = transitions(
+        {
+            (("Age Bin 1", "PT1"), ("Age Bin 1", "PT2")): 0.1,
+            (("Age Bin 1", "PT2"), ("Age Bin 1", "PT1")): float("inf"),
+            (("Age Bin 1", "PT3"), ("Age Bin 1", "PT1")): float("inf"),
+            (("Age Bin 2", "PT2"), ()): 0.02,
+        }
+    )
+    transition_numbers = transitions({((), ("Age Bin 1", "PT3")): 1.5})
+    matrix = TransitionMatrix.from_series(
+        initial_population, transition_rates, transition_numbers
+    )
+
+    population = matrix.vector(initial_population)
+    assert_same_population(
+        transition_population(initial_population, transition_rates, transition_numbers),
+        matrix.series(matrix.jump(population, 1)),
+    )
+
+    stepped = population
+    for _ in range(30):
+        stepped = matrix.step(stepped)
+
+    operator = matrix.operator(30)
+    assert not pd.isna(operator).any()
+    assert matrix.jump(population, 30).tolist() == [
+        pytest.approx(v, abs=1e-9) for v in stepped
+    ]
+
+
+def test_exact_steps_are_consistent(initial_population):
+    predictor = MatrixPredictor(
+        population=initial_population,
+        transition_rates=transitions(
+            {
+                (("Age Bin 1", "PT1"), ("Age Bin 1", "PT2")): 0.1,
+                (("Age Bin 1", "PT2"), ("Age Bin 1", "PT1")): 0.05,
+            }
+        ),
+        transition_numbers=transitions({((), ("Age Bin 1", "PT3")): 1.5}),
+        start_date=date(2020, 1, 1),
+        exact_steps=True,
+    )
+
+    daily = predictor.predict(60, step_days=1)
+    monthly = predictor.predict(2, step_days=30)
+
+    assert_same_population(daily.loc[date(2020, 3, 1)], monthly.iloc[-1])
+    assert_same_population(
+        daily.loc[date(2020, 3, 1)], predictor.population_at(date(2020, 3, 1))
+    )
+
+
+def test_operator_requires_affine_transitions(initial_population):
+    matrix = TransitionMatrix.from_series(
+        initial_population,
+        transition_numbers=transitions(
+            {(("Age Bin 1", "PT1"), ("Age Bin 1", "PT2")): 1}
+        ),
+    )
+    assert not matrix.is_affine
+    with pytest.raises(ValueError):
+        matrix.operator(10)
+
+
+@pytest.mark.parametrize("exact_steps", [False, True])
+def test_scenarios_match_individual_predictions(initial_population, exact_steps):
+    transition_rates = transitions(
+        {
+            (("Age Bin 1", "PT1"), ("Age Bin 1", "PT2")): 0.1,
+            (("Age Bin 1", "PT2"), ("Age Bin 1", "PT1")): 0.05,
+            (("Age Bin 2", "PT2"), ()): 0.02,
+        }
+    )
+    transition_numbers = transitions({((), ("Age Bin 1", "PT3")): 1.5})
+    scenarios = {
+        "base": None,
+        "more_moves": transitions({(("Age Bin 2", "PT1"), ("Age Bin 2", "PT3")): 0.2}),
+        "new_state": Scenario(
+            rate_adjustment=[
+                transitions({(("Age Bin 1", "PT3"), ("Age Bin 3", "PT1")): 0.1}),
+                transitions({(("Age Bin 1", "PT1"), ("Age Bin 1", "PT2")): -0.05}),
+            ],
+            number_adjustment=transitions({((), ("Age Bin 2", "PT3")): 2}),
+        ),
+    }
+
+    predictor = ScenarioPredictor(
+        initial_population,
+        transition_rates,
+        transition_numbers,
+        scenarios=scenarios,
+        start_date=date(2020, 1, 1),
+        exact_steps=exact_steps,
+    )
+    actual = predictor.predict(10, step_days=7)
+    assert actual.index.names == ["scenario", "date"]
+    assert actual.index.get_level_values("scenario").unique().tolist() == list(
+        scenarios
+    )
+
+    individual = {
+        "base": (transition_rates, transition_numbers),
+        "more_moves": (
+            pd.concat([transition_rates, scenarios["more_moves"]]),
+            transition_numbers,
+        ),
+        "new_state": (
+            pd.concat([transition_rates, *scenarios["new_state"].rate_adjustment]),
+            pd.concat([transition_numbers, scenarios["new_state"].number_adjustment]),
+        ),
+    }
+    for name, (rates, numbers) in individual.items():
+        expected = MatrixPredictor(
+            initial_population,
+            rates,
+            numbers,
+            start_date=date(2020, 1, 1),
+            exact_steps=exact_steps,
+        ).predict(10, step_days=7)
+        for ix in range(len(expected)):
+            assert_same_population(expected.iloc[ix], actual.loc[name].iloc[ix])
+
+
+def test_scenarios_from_model_match_model_predictor():
+    config = Config()
+    container = DemandModellingDataContainer(fs_datastore(FIXTURES.as_posix()), config)
+    stats = PopulationStats(container.enriched_view, config)
+
+    start, end = date(2021, 1, 1), date(2021, 12, 31)
+    adjustment = transitions(
+        {(("TEN_TO_SIXTEEN", "FOSTERING"), ("TEN_TO_SIXTEEN", "RESIDENTIAL")): 0.01}
+    )
+    actual = ScenarioPredictor.from_model(
+        stats, start, end, {"base": None, "adjusted": adjustment}
+    ).predict(10, step_days=30)
+
+    for name, rate_adjustment in [("base", None), ("adjusted", adjustment)]:
+        expected = ModelPredictor.from_model(
+            stats, start, end, rate_adjustment=rate_adjustment
+        ).predict(10, step_days=30)
+        for ix in range(len(expected)):
+            assert_same_population(expected.iloc[ix], actual.loc[name].iloc[ix])
+
+
+@pytest.mark.parametrize("exact_steps", [False, True])
+def test_scenarios_with_infinite_rates(initial_population, exact_steps):
+    transition_rates = transitions(
+        {
+            (("Age Bin 1", "PT1"), ("Age Bin 1", "PT2")): 0.1,
+            (("Age Bin 1", "PT2"), ("Age Bin 1", "PT1")): float("inf"),
+            (("Age Bin 1", "PT3"), ("Age Bin 1", "PT1")): float("inf"),
+            (("Age Bin 2", "PT2"), ()): 0.02,
+        }
+    )
+    transition_numbers = transitions({((), ("Age Bin 1", "PT3")): 1.5})
+    adjustment = transitions({(("Age Bin 2", "PT1"), ("Age Bin 2", "PT3")): 0.01})
+
+    actual = ScenarioPredictor(
+        initial_population,
+        transition_rates,
+        transition_numbers,
+        scenarios={"base": None, "adjusted": adjustment},
+        start_date=date(2020, 1, 1),
+        exact_steps=exact_steps,
+    ).predict(10)
+    assert not actual.isna().any().any()
+
+    for name, rates in [
+        ("base", transition_rates),
+        ("adjusted", combine_rates(transition_rates, adjustment)),
+    ]:
+        expected = ModelPredictor(
+            initial_population,
+            rates,
+            transition_numbers,
+            start_date=date(2020, 1, 1),
+        ).predict(10)
+        for ix in range(len(expected)):
+            assert_same_population(expected.iloc[ix], actual.loc[name].iloc[ix])
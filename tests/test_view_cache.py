@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pandas as pd
+from fs.memoryfs import MemoryFS
+
+from cs_demand_model import Config, DemandModellingDataContainer, fs_datastore
+from cs_demand_model._view_cache import cache_key
+from cs_demand_model.datastore._fs import FSDataStore
+
+FIXTURES = Path(__file__).parent / "fixtures" / "combined"
+
+
+def test_warm_run_reads_cached_view(tmp_path):
+    config = Config()
+    cold = DemandModellingDataContainer(
+        fs_datastore(FIXTURES.as_posix()), config, cache_dir=tmp_path
+    )
+    expected = cold.enriched_view
+    assert len(list(tmp_path.iterdir())) == 2
+
+    warm = DemandModellingDataContainer(
+        fs_datastore(FIXTURES.as_posix()), config, cache_dir=tmp_path
+    )
+    pd.testing.assert_frame_equal(warm.enriched_view, expected)
+    assert "combined_data" not in warm.__dict__
+    assert warm.end_date == cold.end_date
+
+
+def test_enums_are_mapped_to_the_loading_config(tmp_path):
+    DemandModellingDataContainer(
+        fs_datastore(FIXTURES.as_posix()), Config(), cache_dir=tmp_path
+    ).enriched_view
+
+    config = Config()
+    view = DemandModellingDataContainer(
+        fs_datastore(FIXTURES.as_posix()), config, cache_dir=tmp_path
+    ).enriched_view
+    assert view["placement_type"].cat.categories.tolist() == list(
+        config.PlacementCategories
+    )
+    assert view["age_bin"].cat.categories.tolist() == list(config.AgeBrackets)
+
+
+def test_cache_key_changes_with_content():
+    config = Config()
+    filesystem = MemoryFS()
+    for path in FIXTURES.glob("2021-*.csv"):
+        filesystem.writebytes(path.name, path.read_bytes())
+    datastore = FSDataStore(filesystem)
+
+    key = DemandModellingDataContainer(datastore, config).cache_key
+    assert key == DemandModellingDataContainer(datastore, config).cache_key
+
+    content = filesystem.readbytes("2021-header.csv")
+    filesystem.writebytes("2021-header.csv", content.replace(b"OOTH", b"WBRI", 1))
+    container = DemandModellingDataContainer(datastore, config)
+    assert container.cache_key != key
+    assert cache_key(datastore, container.file_info, config) == container.cache_key